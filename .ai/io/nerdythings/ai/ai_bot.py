@@ -1,59 +1,92 @@
 from abc import ABC, abstractmethod
+import json
 import re
 from log import Log
 from ai.line_comment import LineComment
-from ai.prompts import CHAT_GPT_ASK_LONG, PROBLEMS, NO_RESPONSE
+from ai.prompts import NO_RESPONSE
+from ai.prompt_compiler import PromptCompiler
+from diff_chunker import DiffChunker
+
+SEVERITY_LABELS = {
+    "warning": ":warning:Warning",
+    "error": ":x:Error",
+    "critical": ":bangbang:Critical",
+}
+MIN_OUTPUT_TOKENS = 256
+MAX_OUTPUT_TOKENS = 4096
+MAX_RENDERED_LINES = 12
 
 
 class AiBot(ABC):
 
     __no_response =  NO_RESPONSE
-    __problems = PROBLEMS
-    __chat_gpt_ask_long = CHAT_GPT_ASK_LONG 
 
     @abstractmethod
-    def ai_request_diffs(self, code, diffs) -> str:
+    def ai_request_diffs(self, code, diffs, metrics=None, cancel_event=None) -> str:
         pass
 
     @staticmethod
-    def build_ask_text(code, diffs) -> str:
-        """Xây dựng prompt cho AI, bao gồm code và diff."""
-
-        if not diffs:
-            return ""
-
-        if isinstance(diffs, str):
-            code_to_review = diffs
-            severity = "Warning"
-            issue_type = "General Issue"
-            issue_description = "Potential issue in the changed code."
-            line_numbers = "N/A"
-            changed_lines = "N/A"
-            explanation = ""
-            suggested_fix = ""
-        else:
-            code_to_review = diffs[0].get("code", "") if isinstance(diffs, list) else diffs.get("code", "")
-            severity = diffs[0].get("severity", "Warning") if isinstance(diffs, list) else diffs.get("severity", "Warning")
-            issue_type = diffs[0].get("type", "General Issue") if isinstance(diffs, list) else diffs.get("type", "General Issue")
-            issue_description = diffs[0].get("issue_description", "No description") if isinstance(diffs, list) else diffs.get("issue_description", "No description")
-            line_numbers = diffs[0].get("line_numbers", "N/A") if isinstance(diffs, list) else diffs.get("line_numbers", "N/A")
-            changed_lines = diffs[0].get("changed_lines", "N/A") if isinstance(diffs, list) else diffs.get("changed_lines", "N/A")
-            explanation = diffs[0].get("explanation", "") if isinstance(diffs, list) else diffs.get("explanation", "")
-            suggested_fix = diffs[0].get("suggested_fix", "") if isinstance(diffs, list) else diffs.get("suggested_fix", "")
-
-        return AiBot.__chat_gpt_ask_long.format(
-            problems=AiBot.__problems,
-            no_response=AiBot.__no_response,
-            diffs=code_to_review,
-            code=code,
-            severity=severity,
-            type=issue_type,  
-            issue_description=issue_description,
-            line_numbers=line_numbers,
-            changed_lines=changed_lines,
-            explanation=explanation,
-            suggested_fix=suggested_fix
-        )
+    def build_messages(code, diffs, structured: bool = False) -> list:
+        """Chat messages with a byte-stable system prefix, see PromptCompiler."""
+        return PromptCompiler.compile(code, diffs, structured=structured)
+
+    @staticmethod
+    def adaptive_max_tokens(diffs) -> int:
+        """Output budget for structured mode: grows with the number of changed lines in the hunk."""
+        diff_data = diffs[0] if isinstance(diffs, list) else diffs
+        diff_text = diff_data if isinstance(diff_data, str) else diff_data.get("code", "")
+        changed = sum(1 for line in diff_text.splitlines()
+                      if line[:1] in ("+", "-") and not line.startswith(("+++", "---")))
+        return max(MIN_OUTPUT_TOKENS, min(MAX_OUTPUT_TOKENS, 128 + 24 * changed))
+
+    @staticmethod
+    def review_comments(response: str, diffs, file_path="") -> list[LineComment]:
+        """Comments for one reviewed chunk: built from the JSON records in structured mode, parsed from Markdown otherwise."""
+        if response and response.lstrip().startswith("{"):
+            return AiBot.issue_comments(response, diffs, file_path=file_path)
+        return AiBot.split_ai_response(response, diffs, file_path=file_path)
+
+    @staticmethod
+    def issue_comments(content: str, diffs, file_path="") -> list[LineComment]:
+        """One comment per structured issue record; the changed lines are taken from the diff, not the model."""
+        issues = json.loads(content).get("issues", [])
+        diff_data = diffs[0] if isinstance(diffs, list) else diffs
+        diff_text = diff_data if isinstance(diff_data, str) else diff_data.get("code", "")
+        new_lines = AiBot.__new_side_lines(diff_text)
+
+        comments = []
+        for issue in issues:
+            severity = SEVERITY_LABELS.get(str(issue.get("severity", "")).lower(), SEVERITY_LABELS["warning"])
+            start = issue.get("start_line") or 0
+            end = max(issue.get("end_line") or start, start)
+            comment_text = f"**File:** {file_path}\n\n"
+            comment_text += f"**[ERROR] - [{severity}] - [{issue.get('type', 'General')}] - {issue.get('description', '').strip()}**\n\n"
+
+            lines = [f"{number}: {new_lines[number]}" for number in range(start, end + 1) if number in new_lines]
+            if lines:
+                comment_text += "**:point_right:Lines:**\n```\n" + "\n".join(lines[:MAX_RENDERED_LINES]) + "\n```\n\n"
+
+            fix = (issue.get("fix") or "").strip()
+            if fix:
+                fix = fix if fix.startswith("+") else f"+{fix}"
+                comment_text += f"**Suggested Fix:**\n```diff\n{fix}\n```\n"
+
+            comments.append(LineComment(line=start, text=comment_text))
+
+        return comments
+
+    @staticmethod
+    def __new_side_lines(diff_text: str) -> dict:
+        """Maps new-file line numbers to the added/context lines present in the diff."""
+        _, hunks = DiffChunker.parse_hunks(diff_text)
+        lines = {}
+        for hunk in hunks:
+            number = hunk.new_start
+            for line in hunk.lines:
+                if line[:1] in (" ", "+", ""):
+                    lines[number] = line[1:]
+                    number += 1
+        return lines
 
     @staticmethod
     def is_no_issues_text(source: str) -> bool:
@@ -61,6 +94,11 @@ class AiBot(ABC):
         source_no_spaces = source.replace(" ", "")
         return source_no_spaces.startswith(target)
 
+    @staticmethod
+    def is_error_text(source: str) -> bool:
+        """True for the placeholder texts returned when a request failed or came back empty."""
+        return source.lstrip().startswith(("❌", "⚠️"))
+
     @staticmethod
     def split_ai_response(input, diffs, file_path="") -> list[LineComment]:
         if not input:
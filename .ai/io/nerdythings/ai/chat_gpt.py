@@ -1,46 +1,154 @@
 import os
-from openai import OpenAI
+import time
+from openai import BadRequestError, OpenAI
 import traceback
 import json
-from ai.ai_bot import AiBot
+from ai.ai_bot import AiBot, MAX_OUTPUT_TOKENS
+from log import Log
+from ai.prompts import ISSUES_JSON_SCHEMA, NO_RESPONSE
+from diff_chunker import estimate_tokens
+from supersede import ReviewSuperseded
 
 class ChatGPT(AiBot):
 
-    def __init__(self, token, model):
+    def __init__(self, token, model, output_mode=None, base_url=None):
         self.__chat_gpt_model = model
-        self.__client = OpenAI(api_key=token)
+        self.__client = OpenAI(api_key=token, base_url=base_url or os.getenv("CHATGPT_BASE_URL") or None)
+        self.__structured = (output_mode or os.getenv("REVIEW_OUTPUT_MODE", "structured")) == "structured"
 
-    def ai_request_diffs(self, code, diffs):
+    def ai_request_diffs(self, code, diffs, metrics=None, cancel_event=None):
         try:
-            response = self.__client.chat.completions.create(
-                messages=[{
-                    "role": "user",
-                    "content": AiBot.build_ask_text(code=code, diffs=diffs)
-                }],
-                model=self.__chat_gpt_model,
-                stream=False,
-                max_tokens=4096
-            )
-
-            print("🔍 Raw response:", response)
-
-            if response and hasattr(response, "choices") and len(response.choices) > 0:
-                ai_message = response.choices[0].message
-                print("🔍 AI message:", ai_message)
-
-                if hasattr(ai_message, "content") and ai_message.content:
-                    return ai_message.content.strip()
-                else:
-                    return "⚠️ AI không cung cấp phản hồi hợp lệ."
-            return "⚠️ Không nhận được phản hồi từ AI."
+            messages = AiBot.build_messages(code=code, diffs=diffs, structured=self.__structured)
+            prompt = "".join(message["content"] for message in messages)
+
+            max_tokens = AiBot.adaptive_max_tokens(diffs) if self.__structured else 4096
+            content, finish_reason = self.__complete(messages, prompt, max_tokens, metrics, cancel_event)
+            if self.__structured and finish_reason == "length" and max_tokens < MAX_OUTPUT_TOKENS:
+                # Truncated JSON is useless; one retry with the full budget instead of recording a failure.
+                Log.print_yellow(f"Structured response hit max_tokens={max_tokens}, retrying with {MAX_OUTPUT_TOKENS}")
+                content, finish_reason = self.__complete(messages, prompt, MAX_OUTPUT_TOKENS, metrics, cancel_event)
+            return self.__finish(content, finish_reason)
+        except ReviewSuperseded:
+            raise
         except Exception as e:
-            import traceback
+            if self.__structured and ChatGPT.__is_schema_rejected(e):
+                Log.print_yellow(f"{self.__chat_gpt_model} rejected the json_schema response format, "
+                                 f"falling back to Markdown output: {e}")
+                self.__structured = False
+                return self.ai_request_diffs(code, diffs, metrics=metrics, cancel_event=cancel_event)
             print(f"🚨 API Error: {e}")
             print(traceback.format_exc())
             return f"❌ Error occurred: {str(e)}"
 
+    def __complete(self, messages, prompt, max_tokens, metrics, cancel_event):
+        """Returns (content, finish_reason) of one completion."""
+        if cancel_event is not None:
+            return self.__request_cancellable(messages, prompt, max_tokens, metrics, cancel_event)
+
+        started = time.monotonic()
+        response = self.__client.chat.completions.create(
+            messages=messages,
+            model=self.__chat_gpt_model,
+            stream=False,
+            **self.__output_options(max_tokens)
+        )
+        ChatGPT.__record_usage(metrics, getattr(response, "usage", None), time.monotonic() - started)
+
+        print("🔍 Raw response:", response)
+
+        if response and hasattr(response, "choices") and len(response.choices) > 0:
+            ai_message = response.choices[0].message
+            print("🔍 AI message:", ai_message)
+
+            if hasattr(ai_message, "content") and ai_message.content:
+                return ai_message.content.strip(), response.choices[0].finish_reason
+            else:
+                return "⚠️ AI không cung cấp phản hồi hợp lệ.", None
+        return "⚠️ Không nhận được phản hồi từ AI.", None
+
+    def __output_options(self, max_tokens: int) -> dict:
+        if not self.__structured:
+            return {"max_tokens": max_tokens}
+        return {
+            "max_tokens": max_tokens,
+            "response_format": {"type": "json_schema", "json_schema": ISSUES_JSON_SCHEMA},
+        }
+
+    def __finish(self, content, finish_reason):
+        """In structured mode the JSON is validated here; comments are built from it by AiBot.review_comments."""
+        if not self.__structured or not content or AiBot.is_error_text(content):
+            return content
+        if finish_reason == "length":
+            return f"❌ Error occurred: structured response truncated at {MAX_OUTPUT_TOKENS} tokens"
+        try:
+            issues = json.loads(content).get("issues", [])
+        except (ValueError, AttributeError) as e:
+            return f"❌ Error occurred: invalid structured response ({e})"
+        return content if issues else NO_RESPONSE
+
+    @staticmethod
+    def __is_schema_rejected(error: Exception) -> bool:
+        return isinstance(error, BadRequestError) and any(
+            word in str(error) for word in ("response_format", "json_schema"))
+
+    def __request_cancellable(self, messages, prompt, max_tokens, metrics, cancel_event):
+        """Streams the completion so the request can be dropped as soon as `cancel_event` is set."""
+        if cancel_event.is_set():
+            raise ReviewSuperseded("Review cancelled before the request was sent")
+
+        started = time.monotonic()
+        stream = self.__client.chat.completions.create(
+            messages=messages,
+            model=self.__chat_gpt_model,
+            stream=True,
+            stream_options={"include_usage": True},
+            **self.__output_options(max_tokens)
+        )
+
+        parts = []
+        usage = None
+        finish_reason = None
+        try:
+            for chunk in stream:
+                if cancel_event.is_set():
+                    if metrics:
+                        metrics.record_cancelled(estimate_tokens(prompt) + estimate_tokens("".join(parts)))
+                    raise ReviewSuperseded("Review cancelled while the request was in flight")
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+        finally:
+            stream.close()
+
+        ChatGPT.__record_usage(metrics, usage, time.monotonic() - started)
+
+        content = "".join(parts).strip()
+        return (content, finish_reason) if content else ("⚠️ AI không cung cấp phản hồi hợp lệ.", None)
+
+    @staticmethod
+    def __record_usage(metrics, usage, latency):
+        if usage is None:
+            if metrics:
+                metrics.record_request(0, 0, latency)
+            return
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        Log.print_green(f"Usage: prompt_tokens={usage.prompt_tokens}, cached_tokens={cached_tokens}, "
+                        f"completion_tokens={usage.completion_tokens}, latency={latency:.2f}s")
+        if metrics:
+            metrics.record_request(
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                latency=latency,
+                cached_tokens=cached_tokens,
+            )
+
 
-    def ai_request_summary(self, file_changes, summary_prompt=None):  # Đổi tên prompt thành summary_prompt để rõ ràng hơn
+    def ai_request_summary(self, file_changes, summary_prompt=None, metrics=None):  # Đổi tên prompt thành summary_prompt để rõ ràng hơn
         try:
             print(f"🔍 Debug: type(file_changes) = {type(file_changes)}")
             print(f"🔍 Debug: file_changes keys = {list(file_changes.keys())}")
@@ -74,12 +182,14 @@ class ChatGPT(AiBot):
                 messages.append({"role": "user", "content": summary_request})
 
 
+            started = time.monotonic()
             response = self.__client.chat.completions.create(
                 messages=messages,  # Use the list of messages we created.
                 model=self.__chat_gpt_model,
                 stream=False,
                 max_tokens=2048
             )
+            ChatGPT.__record_usage(metrics, getattr(response, "usage", None), time.monotonic() - started)
 
             if response and response.choices and len(response.choices) > 0:
                 ai_message = response.choices[0].message
@@ -0,0 +1,42 @@
+from ai.prompts import REVIEW_SYSTEM_PROMPT, REVIEW_SYSTEM_PROMPT_STRUCTURED, FILE_CONTEXT_TEMPLATE, HUNK_PAYLOAD_TEMPLATE, \
+    HUNK_CONTEXT_TEMPLATE, STATIC_ANALYSIS_TEMPLATE
+
+
+class PromptCompiler:
+    """Builds chat messages ordered from most to least stable so requests share a prefix.
+
+    1. system: review instructions and output format (identical for every request, ~420 tokens)
+    2. user:   file outline (identical for every chunk of the same file, up to OUTLINE_MAX_TOKENS)
+    3. user:   per-chunk payload (diff, line range, numbered lines around the change, static findings)
+
+    Providers such as OpenAI only serve a prefix from cache once it is at least 1024 tokens, so the
+    chunks of a file hit the cache only when system prompt and outline together reach that size;
+    files with a small outline are sent uncached.
+    """
+
+    @staticmethod
+    def compile(code, diffs, structured: bool = False) -> list:
+        if not diffs:
+            return []
+
+        if isinstance(diffs, list):
+            diffs = diffs[0]
+        if isinstance(diffs, str):
+            diffs = {"code": diffs}
+
+        file_path = diffs.get("file_path") or "(unknown file)"
+        system_prompt = REVIEW_SYSTEM_PROMPT_STRUCTURED if structured else REVIEW_SYSTEM_PROMPT
+        messages = [{"role": "system", "content": system_prompt}]
+        if code:
+            messages.append({"role": "user", "content": FILE_CONTEXT_TEMPLATE.format(file_path=file_path, code=code)})
+        hunk_payload = HUNK_PAYLOAD_TEMPLATE.format(
+            file_path=file_path,
+            line_numbers=diffs.get("line_numbers", "N/A"),
+            diffs=diffs.get("code", ""),
+        )
+        if diffs.get("context"):
+            hunk_payload += HUNK_CONTEXT_TEMPLATE.format(context=diffs["context"])
+        if diffs.get("static_analysis"):
+            hunk_payload += STATIC_ANALYSIS_TEMPLATE.format(findings=diffs["static_analysis"])
+        messages.append({"role": "user", "content": hunk_payload})
+        return messages
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+from log import Log
+
+DEFAULT_CHECKPOINT_DIR = ".ai_review_checkpoints"
+SKIPPED_COMMENT = "skipped"
+
+
+class ReviewCheckpoint:
+    """Persists completed review units of one run so a rerun for the same head SHA can resume.
+
+    Layout of the JSON file:
+        {"head_sha": ..., "summaries": {file: summary},
+         "units": {unit_key: {"findings": [comment text], "comment_ids": {index: id}}}}
+    """
+
+    def __init__(self, path: str, head_sha: str):
+        self.path = path
+        self.head_sha = head_sha
+        self.summaries = {}
+        self.units = {}
+        self.__load()
+
+    @staticmethod
+    def for_run(vars, checkpoint_dir: str = None) -> "ReviewCheckpoint":
+        checkpoint_dir = checkpoint_dir or os.getenv("REVIEW_CHECKPOINT_DIR", DEFAULT_CHECKPOINT_DIR)
+        name = f"{vars.owner}_{vars.repo}_{vars.pull_number}_{vars.head_ref}.json"
+        return ReviewCheckpoint(os.path.join(checkpoint_dir, name), vars.head_ref)
+
+    @staticmethod
+    def unit_key(file: str, diff_text: str) -> str:
+        return hashlib.sha1(f"{file}\x00{diff_text}".encode("utf-8")).hexdigest()
+
+    def get_summary(self, file: str):
+        return self.summaries.get(file)
+
+    def record_summary(self, file: str, summary: str):
+        self.summaries[file] = summary
+        self.save()
+
+    def get_findings(self, key: str):
+        """Returns the recorded comment texts of a unit, or None when the AI call has not completed yet."""
+        unit = self.units.get(key)
+        return unit["findings"] if unit else None
+
+    def record_findings(self, key: str, findings: list):
+        self.units[key] = {"findings": list(findings), "comment_ids": {}}
+        self.save()
+
+    def is_posted(self, key: str, index: int) -> bool:
+        unit = self.units.get(key)
+        return bool(unit) and str(index) in unit["comment_ids"]
+
+    def record_posted(self, key: str, index: int, comment_id):
+        self.units[key]["comment_ids"][str(index)] = comment_id if comment_id is not None else SKIPPED_COMMENT
+        self.save()
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"head_sha": self.head_sha, "summaries": self.summaries, "units": self.units}, f)
+        os.replace(temp_path, self.path)
+
+    def __load(self):
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            Log.print_yellow(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return
+
+        if data.get("head_sha") != self.head_sha:
+            Log.print_yellow(f"Checkpoint {self.path} belongs to {data.get('head_sha')}, starting fresh.")
+            return
+
+        self.summaries = data.get("summaries", {})
+        self.units = data.get("units", {})
+        Log.print_green(f"Resuming from checkpoint: {len(self.units)} review unit(s), {len(self.summaries)} summaries done.")
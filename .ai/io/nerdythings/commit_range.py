@@ -0,0 +1,83 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+COMMIT_LINE_PATTERN = re.compile(r"^commit ([0-9a-f]{40})")
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class CommitRangeAttribution:
+    """Tracks which commit of a range last wrote each line, from one `git log -p -U0 --reverse` stream.
+
+    Every file is a list of owners (commit SHA or None for lines unchanged since the range base).
+    Lines rewritten later take the later commit, deleted lines disappear, so reverted or overwritten
+    intermediate changes leave nothing behind to review.
+    """
+
+    def __init__(self):
+        self.commits: List[str] = []
+        self.__owners: Dict[str, List[Optional[str]]] = {}
+
+    @staticmethod
+    def from_log(lines: Iterable[str]) -> "CommitRangeAttribution":
+        attribution = CommitRangeAttribution()
+        commit = None
+        old_path = new_path = None
+        pending = []
+
+        def flush():
+            if commit and new_path is not None:
+                attribution.__apply(commit, old_path, new_path, pending)
+
+        for line in lines:
+            line = line.rstrip("\n")
+            commit_match = COMMIT_LINE_PATTERN.match(line)
+            if commit_match:
+                flush()
+                commit = commit_match.group(1)
+                attribution.commits.append(commit)
+                old_path = new_path = None
+                pending = []
+            elif line.startswith("diff --git "):
+                flush()
+                old_path = new_path = None
+                pending = []
+            elif line.startswith("--- ") and not pending:
+                old_path = None if line == "--- /dev/null" else line[len("--- a/"):]
+            elif line.startswith("+++ ") and not pending:
+                new_path = "/dev/null" if line == "+++ /dev/null" else line[len("+++ b/"):]
+            else:
+                hunk_match = HUNK_HEADER_PATTERN.match(line)
+                if hunk_match:
+                    old_start, old_length, _, new_length = hunk_match.groups()
+                    pending.append((
+                        int(old_start),
+                        int(old_length) if old_length is not None else 1,
+                        int(new_length) if new_length is not None else 1,
+                    ))
+        flush()
+        return attribution
+
+    def commit_for_lines(self, file_path: str, line_numbers: Iterable[int], default: str = None) -> Optional[str]:
+        """The latest commit in the range that wrote any of `line_numbers` of the final file."""
+        owners = self.__owners.get(file_path, [])
+        order = {sha: index for index, sha in enumerate(self.commits)}
+        latest = None
+        for number in line_numbers:
+            owner = owners[number - 1] if 0 < number <= len(owners) else None
+            if owner and (latest is None or order[owner] > order[latest]):
+                latest = owner
+        return latest or default
+
+    def __apply(self, commit: str, old_path: Optional[str], new_path: str, hunks: list):
+        if new_path == "/dev/null":
+            self.__owners.pop(old_path, None)
+            return
+
+        owners = self.__owners.pop(old_path, []) if old_path else []
+        # Bottom-up so the old-side line numbers of the remaining hunks stay valid.
+        for old_start, old_length, new_length in sorted(hunks, reverse=True):
+            index = old_start - 1 if old_length > 0 else old_start
+            if len(owners) < index + old_length:
+                owners.extend([None] * (index + old_length - len(owners)))
+            owners[index:index + old_length] = [commit] * new_length
+        self.__owners[new_path] = owners
@@ -0,0 +1,317 @@
+import os
+import re
+from typing import List, Optional
+from log import Log
+
+try:
+    from tree_sitter_languages import get_parser
+except ImportError:
+    get_parser = None
+
+DEFAULT_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "1200"))
+# Share of the per-request budget kept for source lines around the chunk; the diff gets the rest.
+CONTEXT_SHARE = 0.4
+# Cap of the per-file outline, sent on top of the chunk budget. It is identical for every chunk of a
+# file, so together with the system prompt (~420 tokens) it forms the cacheable prefix.
+OUTLINE_MAX_TOKENS = int(os.getenv("OUTLINE_MAX_TOKENS", "700"))
+
+# Declaration lines (functions, classes, exported handlers) that make up a file outline.
+OUTLINE_LINE_PATTERN = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?(?:(?:public|private|protected|internal|static|abstract|override|async|suspend|open|data)\s+)*"
+    r"(?:def|class|function|interface|fun|func|struct|enum|object|impl|trait)\b"
+    r"|^\s*(?:export\s+)?(?:const|let|var)\s+[\w$]+\s*=\s*(?:async\s*)?(?:function\b|\([^)]*\)\s*=>|[\w$]+\s*=>)"
+)
+
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$")
+
+TREE_SITTER_LANGUAGES = {
+    "kt": "kotlin",
+    "java": "java",
+    "py": "python",
+    "js": "javascript",
+    "ts": "typescript",
+    "swift": "swift",
+    "c": "c",
+    "cpp": "cpp",
+}
+
+SCOPE_NODE_KEYWORDS = ("function", "method", "class", "constructor", "interface", "object_declaration")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for sizing requests."""
+    return len(text) // 4 + 1
+
+
+class DiffHunk:
+
+    def __init__(self, old_start: int, old_length: int, new_start: int, new_length: int, section: str, lines: List[str]):
+        self.old_start = old_start
+        self.old_length = old_length
+        self.new_start = new_start
+        self.new_length = new_length
+        self.section = section
+        self.lines = lines
+
+    @property
+    def new_end(self) -> int:
+        return self.new_start + max(self.new_length, 1) - 1
+
+    def header(self) -> str:
+        return f"@@ -{self.old_start},{self.old_length} +{self.new_start},{self.new_length} @@{self.section}"
+
+    def text(self) -> str:
+        return "\n".join([self.header()] + self.lines)
+
+
+class DiffChunk:
+
+    def __init__(self, file_header: str, hunks: List[DiffHunk], scope: Optional[str] = None):
+        self.file_header = file_header
+        self.hunks = hunks
+        self.scope = scope
+        # Numbered head-version lines around the chunk (enclosing scope or a line window), sent with the hunk.
+        self.context = ""
+        # Numbered declaration lines of the whole file; the same string for every chunk of the file.
+        self.outline = ""
+
+    @property
+    def new_start(self) -> int:
+        return self.hunks[0].new_start
+
+    @property
+    def new_end(self) -> int:
+        return self.hunks[-1].new_end
+
+    @property
+    def changed_lines(self) -> str:
+        return "\n".join(line for hunk in self.hunks for line in hunk.lines if line[:1] in ("+", "-"))
+
+    @property
+    def added_line_numbers(self) -> List[int]:
+        """New-file line numbers of the `+` lines in this chunk."""
+        numbers = []
+        for hunk in self.hunks:
+            number = hunk.new_start
+            for line in hunk.lines:
+                prefix = line[:1]
+                if prefix == "+":
+                    numbers.append(number)
+                if prefix in ("+", " ", ""):
+                    number += 1
+        return numbers
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+    @property
+    def text(self) -> str:
+        parts = [self.file_header] if self.file_header else []
+        parts.extend(hunk.text() for hunk in self.hunks)
+        return "\n".join(parts)
+
+
+class DiffChunker:
+    """Splits a single-file diff at `@@` hunks and regroups them by enclosing function/class."""
+
+    def __init__(self, target_tokens: int = DEFAULT_TARGET_TOKENS):
+        self.target_tokens = max(target_tokens, 100)
+
+    def chunk_file_diff(self, file_diff: str, file_path: str = "", file_content: str = None) -> List[DiffChunk]:
+        file_header, hunks = DiffChunker.parse_hunks(file_diff)
+        if not hunks:
+            # Binary files and mode-only changes have no hunks and nothing to review.
+            return []
+
+        header_tokens = estimate_tokens(file_header)
+        context_budget = int(self.target_tokens * CONTEXT_SHARE) if file_content else 0
+        budget = max(self.target_tokens - context_budget - header_tokens, 50)
+
+        pieces = []
+        for hunk in hunks:
+            pieces.extend(self.__split_hunk(hunk, budget))
+
+        scopes = DiffChunker.__find_scopes(file_path, file_content, pieces)
+
+        groups = []
+        current = []
+        current_scope = None
+        current_tokens = 0
+        for piece, scope in zip(pieces, scopes):
+            piece_tokens = estimate_tokens(piece.text())
+            same_scope = scope is not None and scope == current_scope
+            fits = current_tokens + piece_tokens <= budget
+            if current and not (fits and (same_scope or scope is None and current_scope is None)):
+                groups.append((current, current_scope))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_scope = scope
+            current_tokens += piece_tokens
+
+        if current:
+            groups.append((current, current_scope))
+
+        file_lines = file_content.splitlines() if file_content else []
+        outline = DiffChunker.outline(file_lines)
+        chunks = []
+        for group, scope in groups:
+            chunk = DiffChunk(file_header, group, f"{scope[0]}:{scope[1]}-{scope[2]}" if scope else None)
+            bounds = (scope[1], scope[2]) if scope else None
+            chunk.context = DiffChunker.__context_window(chunk, file_lines, bounds, self.target_tokens - chunk.tokens)
+            chunk.outline = outline
+            chunks.append(chunk)
+
+        return chunks
+
+    @staticmethod
+    def outline(file_lines: List[str], max_tokens: int = OUTLINE_MAX_TOKENS) -> str:
+        """Numbered declaration lines of the file, in file order, up to `max_tokens`."""
+        lines = []
+        used = 0
+        for number, line in enumerate(file_lines, start=1):
+            if not OUTLINE_LINE_PATTERN.match(line):
+                continue
+            entry = f"{number}: {line.rstrip()[:160]}"
+            used += estimate_tokens(entry)
+            if used > max_tokens:
+                break
+            lines.append(entry)
+        return "\n".join(lines)
+
+    @staticmethod
+    def parse_hunks(file_diff: str):
+        """Returns the file header (`diff --git` .. `+++`) and the list of hunks of a single-file diff."""
+        header_lines = []
+        hunks = []
+        current = None
+
+        for line in file_diff.splitlines():
+            match = HUNK_HEADER_PATTERN.match(line)
+            if match:
+                old_start, old_length, new_start, new_length, section = match.groups()
+                current = DiffHunk(
+                    old_start=int(old_start),
+                    old_length=int(old_length) if old_length is not None else 1,
+                    new_start=int(new_start),
+                    new_length=int(new_length) if new_length is not None else 1,
+                    section=section,
+                    lines=[],
+                )
+                hunks.append(current)
+            elif current is not None:
+                current.lines.append(line)
+            else:
+                header_lines.append(line)
+
+        return "\n".join(header_lines), hunks
+
+    def __split_hunk(self, hunk: DiffHunk, budget: int) -> List[DiffHunk]:
+        """Splits an oversized hunk into line windows, recomputing the `@@` ranges of each window."""
+        if estimate_tokens(hunk.text()) <= budget:
+            return [hunk]
+
+        windows = []
+        old_line = hunk.old_start
+        new_line = hunk.new_start
+        window = DiffHunk(old_line, 0, new_line, 0, hunk.section, [])
+        window_tokens = 0
+
+        for line in hunk.lines:
+            line_tokens = estimate_tokens(line)
+            if window.lines and window_tokens + line_tokens > budget:
+                windows.append(window)
+                window = DiffHunk(old_line, 0, new_line, 0, hunk.section, [])
+                window_tokens = 0
+
+            window.lines.append(line)
+            window_tokens += line_tokens
+            prefix = line[:1]
+            if prefix in (" ", ""):
+                window.old_length += 1
+                window.new_length += 1
+                old_line += 1
+                new_line += 1
+            elif prefix == "-":
+                window.old_length += 1
+                old_line += 1
+            elif prefix == "+":
+                window.new_length += 1
+                new_line += 1
+
+        if window.lines:
+            windows.append(window)
+
+        return windows
+
+    @staticmethod
+    def __context_window(chunk: DiffChunk, file_lines: List[str], bounds: Optional[tuple], budget: int) -> str:
+        """Numbered file lines around the chunk's hunks that fit in `budget` tokens, inside `bounds` when known.
+
+        Lines are taken by distance to the nearest hunk, so every hunk gets a window of the same radius;
+        gaps between windows are marked with `...`.
+        """
+        if not file_lines or budget <= 0:
+            return ""
+
+        low, high = bounds or (1, len(file_lines))
+        low, high = max(low, 1), min(high, len(file_lines))
+        ranges = [(hunk.new_start, hunk.new_end) for hunk in chunk.hunks]
+
+        def distance(number):
+            return min(max(start - number, number - end, 0) for start, end in ranges)
+
+        taken = {}
+        used = 0
+        for number in sorted(range(low, high + 1), key=lambda number: (distance(number), number)):
+            line = f"{number}: {file_lines[number - 1]}"
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                break
+            taken[number] = line
+            used += cost
+
+        lines = []
+        previous = None
+        for number in sorted(taken):
+            if previous is not None and number != previous + 1:
+                lines.append("...")
+            lines.append(taken[number])
+            previous = number
+        return "\n".join(lines)
+
+    @staticmethod
+    def __find_scopes(file_path: str, file_content: str, hunks: List[DiffHunk]) -> List[Optional[tuple]]:
+        """(node type, start line, end line) of the innermost function/class around each hunk; None without a parser."""
+        tree = DiffChunker.__parse_tree(file_path, file_content)
+        if tree is None:
+            return [None] * len(hunks)
+
+        scopes = []
+        for hunk in hunks:
+            node = tree.root_node.descendant_for_point_range((hunk.new_start - 1, 0), (hunk.new_end - 1, 0))
+            scope = None
+            while node is not None:
+                if any(keyword in node.type for keyword in SCOPE_NODE_KEYWORDS):
+                    scope = (node.type, node.start_point[0] + 1, node.end_point[0] + 1)
+                    break
+                node = node.parent
+            scopes.append(scope)
+        return scopes
+
+    @staticmethod
+    def __parse_tree(file_path: str, file_content: str):
+        if get_parser is None or not file_content:
+            return None
+
+        extension = os.path.splitext(file_path)[1].lstrip(".").lower()
+        language = TREE_SITTER_LANGUAGES.get(extension)
+        if not language:
+            return None
+
+        try:
+            return get_parser(language).parse(file_content.encode("utf-8"))
+        except Exception as e:
+            Log.print_yellow(f"tree-sitter parser unavailable for {language}: {e}")
+            return None
@@ -8,18 +8,22 @@ dotenv_path = os.path.join(os.path.dirname(__file__), ".env")
 load_dotenv(dotenv_path=dotenv_path)
 
 class EnvVars:
-    def __init__(self):
-        self.event_name = os.getenv('GITHUB_EVENT_NAME')
+    def __init__(self, event_name: str = None, event_payload: dict = None, repo_path: str = None):
+        """Reads the event from GITHUB_EVENT_PATH, or uses `event_payload` when it is given (daemon mode)."""
+        self.event_name = event_name or os.getenv('GITHUB_EVENT_NAME')
         self.event_path = os.getenv('GITHUB_EVENT_PATH')
         self.chat_gpt_token = os.getenv('CHATGPT_KEY')
         self.chat_gpt_model = os.getenv('CHATGPT_MODEL')
-        self.repo_path = os.getenv('GITHUB_WORKSPACE')
+        self.repo_path = repo_path or os.getenv('GITHUB_WORKSPACE')
 
-        if not self.event_path:
-            raise ValueError("GITHUB_EVENT_PATH is not set. Make sure this variable is defined.")
+        if event_payload is not None:
+            self.event_payload = event_payload
+        else:
+            if not self.event_path:
+                raise ValueError("GITHUB_EVENT_PATH is not set. Make sure this variable is defined.")
 
-        with open(self.event_path, 'r') as f:
-            self.event_payload = json.load(f)
+            with open(self.event_path, 'r') as f:
+                self.event_payload = json.load(f)
 
         if self.event_name == 'pull_request':
             self.handle_pull_request_event()
@@ -62,8 +66,9 @@ class EnvVars:
             self.head_ref = self.event_payload['after']
 
     def handle_push_event(self):
-        self.owner = os.getenv('GITHUB_REPOSITORY_OWNER')
-        self.repo = os.getenv('GITHUB_REPOSITORY').split('/')[-1]
+        repository = self.event_payload.get('repository', {})
+        self.owner = repository.get('owner', {}).get('login') or os.getenv('GITHUB_REPOSITORY_OWNER')
+        self.repo = (repository.get('full_name') or os.getenv('GITHUB_REPOSITORY', '')).split('/')[-1]
         self.token = os.getenv('GITHUB_TOKEN')
         self.base_ref = self.event_payload['before']
         self.head_ref = self.event_payload['after']
@@ -0,0 +1,217 @@
+"""Offline evaluation of review quality against cost and latency.
+
+Runs every labelled hunk in eval/corpus through the same chunking, prompt and parsing path as
+the review pipeline, using recorded responses (backend "replay") or an OpenAI-compatible endpoint
+(backend "openai", e.g. a local model server), and reports precision/recall next to tokens,
+requests and p50/p95 latency per config.
+
+Recordings are only ever written by `--record` against a live config; a replay config names the
+live config it replays in "recording".
+
+    python .ai/io/nerdythings/eval/run_eval.py --config gpt-4o-mini-structured --record
+    python .ai/io/nerdythings/eval/run_eval.py                      # all replay configs with recordings
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.ai_bot import AiBot
+from ai.prompts import NO_RESPONSE
+from diff_chunker import DiffChunker
+from log import Log
+from metrics import RunMetrics
+
+EVAL_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(EVAL_DIR, "corpus")
+RECORDINGS_DIR = os.path.join(EVAL_DIR, "recordings")
+CONFIGS_PATH = os.path.join(EVAL_DIR, "configs.json")
+LINE_TOLERANCE = 2
+
+LINES_BLOCK_PATTERN = re.compile(r"Lines:\**\s*```\s*([\s\S]*?)```")
+LINE_RANGE_PATTERN = re.compile(r"^\s*(\d+)(?:\s*-\s*(\d+))?\s*:", re.MULTILINE)
+
+
+class ReplayBot(AiBot):
+    """Answers with the responses recorded for each case; usage and latency come from the recording."""
+
+    def __init__(self, recording_name: str):
+        self.__recordings_dir = os.path.join(RECORDINGS_DIR, recording_name)
+        self.case_id = None
+        self.chunk_index = 0
+
+    def ai_request_diffs(self, code, diffs, metrics=None, cancel_event=None) -> str:
+        path = os.path.join(self.__recordings_dir, f"{self.case_id}.json")
+        with open(path, "r", encoding="utf-8") as f:
+            recording = json.load(f)["responses"][self.chunk_index]
+
+        usage = recording.get("usage", {})
+        if metrics:
+            metrics.record_request(
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+                latency=recording.get("latency", 0.0),
+                cached_tokens=usage.get("cached_tokens", 0),
+            )
+
+        content = recording["content"]
+        if content.lstrip().startswith("{") and not json.loads(content).get("issues"):
+            return NO_RESPONSE
+        return content
+
+
+def load_corpus() -> list:
+    cases = []
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if name.endswith(".json"):
+            with open(os.path.join(CORPUS_DIR, name), "r", encoding="utf-8") as f:
+                cases.append(json.load(f))
+    return cases
+
+
+def recording_name(config: dict) -> str:
+    return config.get("recording", config["name"])
+
+
+def build_bot(config: dict):
+    if config["backend"] == "replay":
+        return ReplayBot(recording_name(config))
+
+    from ai.chat_gpt import ChatGPT
+    token = config.get("api_key") or os.getenv("CHATGPT_KEY")
+    return ChatGPT(token, config["model"], output_mode=config.get("output_mode"), base_url=config.get("base_url"))
+
+
+def extract_findings(response: str, diff_data: dict) -> list:
+    """Returns one (start, end) range per posted comment; (None, None) when the comment has no line info."""
+    if not response or AiBot.is_no_issues_text(response) or AiBot.is_error_text(response):
+        return []
+
+    findings = []
+    for comment in AiBot.review_comments(response, diff_data, file_path=diff_data["file_path"]):
+        block = LINES_BLOCK_PATTERN.search(comment.text)
+        match = LINE_RANGE_PATTERN.search(block.group(1)) if block else None
+        if match:
+            start = int(match.group(1))
+            lines = LINE_RANGE_PATTERN.findall(block.group(1))
+            findings.append((start, max(int(last or first) for first, last in lines)))
+        elif isinstance(comment.line, int) and comment.line:
+            findings.append((comment.line, comment.line))
+        else:
+            findings.append((None, None))
+    return findings
+
+
+def matches(finding, expected: dict) -> bool:
+    start, end = finding
+    if start is None:
+        # Without a line range the comment cannot be placed, so it never counts as finding the issue.
+        return False
+    return start <= expected["end_line"] + LINE_TOLERANCE and end >= expected["start_line"] - LINE_TOLERANCE
+
+
+def evaluate(config: dict, cases: list, record: bool = False) -> dict:
+    bot = build_bot(config)
+    chunker = DiffChunker(config.get("chunk_target_tokens", 1200))
+    metrics = RunMetrics()
+    true_positives = false_positives = found_expected = total_expected = 0
+
+    for case in cases:
+        findings = []
+        responses = []
+        for index, chunk in enumerate(chunker.chunk_file_diff(case["diff"], case["file_path"], case.get("code"))):
+            if isinstance(bot, ReplayBot):
+                bot.case_id, bot.chunk_index = case["id"], index
+            diff_data = {
+                "file_path": case["file_path"],
+                "code": chunk.text,
+                "line_numbers": f"{chunk.new_start}-{chunk.new_end}",
+                "changed_lines": chunk.changed_lines,
+                "context": chunk.context,
+            }
+            before = metrics.as_dict()
+            response = bot.ai_request_diffs(code=chunk.outline, diffs=diff_data, metrics=metrics)
+            responses.append({
+                "content": response,
+                "usage": {key: metrics.as_dict()[key] - before[key]
+                          for key in ("prompt_tokens", "completion_tokens", "cached_tokens")},
+                # A retried request (e.g. truncated structured output) is replayed as one request.
+                "latency": round(sum(metrics.latencies[before["requests"]:]), 3),
+            })
+            findings.extend(extract_findings(response, diff_data))
+
+        expected = case.get("expected", [])
+        total_expected += len(expected)
+        found_expected += sum(1 for issue in expected if any(matches(f, issue) for f in findings))
+        for finding in findings:
+            if any(matches(finding, issue) for issue in expected):
+                true_positives += 1
+            else:
+                false_positives += 1
+
+        if record and config["backend"] != "replay":
+            save_recording(config["name"], case["id"], responses)
+
+    reported = true_positives + false_positives
+    return {
+        "config": config["name"],
+        "cases": len(cases),
+        "precision": round(true_positives / reported, 3) if reported else 1.0,
+        "recall": round(found_expected / total_expected, 3) if total_expected else 1.0,
+        **metrics.as_dict(),
+    }
+
+
+def save_recording(config_name: str, case_id: str, responses: list):
+    directory = os.path.join(RECORDINGS_DIR, config_name)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{case_id}.json"), "w", encoding="utf-8") as f:
+        json.dump({"responses": responses}, f, indent=2)
+        f.write("\n")
+
+
+def print_report(results: list):
+    columns = ["config", "precision", "recall", "requests", "prompt_tokens", "cached_tokens",
+               "completion_tokens", "latency_p50", "latency_p95"]
+    print("| " + " | ".join(columns) + " |")
+    print("|" + "---|" * len(columns))
+    for result in results:
+        print("| " + " | ".join(str(result[column]) for column in columns) + " |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate reviewer configs for finding quality vs. cost/latency.")
+    parser.add_argument("--config", action="append", help="Config name from configs.json (repeatable). Defaults to all replay configs.")
+    parser.add_argument("--record", action="store_true", help="Save live responses as recordings for later replay.")
+    parser.add_argument("--output", help="Write the results as JSON to this path.")
+    args = parser.parse_args()
+
+    with open(CONFIGS_PATH, "r", encoding="utf-8") as f:
+        configs = json.load(f)
+    if args.config:
+        configs = [config for config in configs if config["name"] in args.config]
+    else:
+        configs = [config for config in configs if config["backend"] == "replay"
+                   and os.path.isdir(os.path.join(RECORDINGS_DIR, recording_name(config)))]
+
+    if not configs:
+        Log.print_red("No matching eval configs. Record one first, e.g. --config gpt-4o-mini-structured --record")
+        return
+
+    cases = load_corpus()
+    results = []
+    for config in configs:
+        Log.print_green(f"Evaluating {config['name']} on {len(cases)} cases...")
+        results.append(evaluate(config, cases, record=args.record))
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
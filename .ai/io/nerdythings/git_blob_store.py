@@ -0,0 +1,119 @@
+import re
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from log import Log
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+FULL_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
+
+class GitBlobStore:
+    """Serves file contents at any revision from one long-lived `git cat-file --batch` process.
+
+    Blobs are kept in an LRU bounded by total bytes; callers that only need a few lines should use
+    `read_lines` so the decoded line list is reused instead of re-splitting the whole file.
+    """
+
+    def __init__(self, repo_path: str = None, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.repo_path = repo_path
+        self.cache_bytes = cache_bytes
+        self.__lock = threading.Lock()
+        self.__process = None
+        self.__cache = OrderedDict()
+        self.__cached_bytes = 0
+        self.__resolved = {}
+
+    def read_text(self, rev: str, path: str) -> Optional[str]:
+        """Returns the content of `path` at `rev`, or None when it does not exist there."""
+        lines = self.__get_lines(rev, path)
+        return None if lines is None else "".join(lines)
+
+    def read_lines(self, rev: str, path: str, start: int = 1, end: int = None) -> Optional[List[str]]:
+        """Returns lines `start`..`end` (1-based, inclusive) of `path` at `rev`."""
+        lines = self.__get_lines(rev, path)
+        if lines is None:
+            return None
+        return lines[max(start, 1) - 1:end]
+
+    def read_prefix(self, rev: str, path: str, max_chars: int) -> Optional[str]:
+        text = self.read_text(rev, path)
+        return None if text is None else text[:max_chars]
+
+    def close(self):
+        with self.__lock:
+            if self.__process is not None:
+                self.__process.stdin.close()
+                self.__process.wait()
+                self.__process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __get_lines(self, rev: str, path: str) -> Optional[List[str]]:
+        with self.__lock:
+            commit = self.__resolve(rev)
+            key = (commit, path)
+            if key in self.__cache:
+                self.__cache.move_to_end(key)
+                return self.__cache[key][0]
+
+            data = self.__cat_file(f"{commit}:{path}")
+            if data is None:
+                return None
+
+            lines = data.decode("utf-8", errors="replace").splitlines(keepends=True)
+            self.__cache[key] = (lines, len(data))
+            self.__cached_bytes += len(data)
+            while self.__cached_bytes > self.cache_bytes and len(self.__cache) > 1:
+                _, (_, size) = self.__cache.popitem(last=False)
+                self.__cached_bytes -= size
+            return lines
+
+    def __resolve(self, rev: str) -> str:
+        """Maps `rev` to a commit SHA so cache keys never follow a moving ref.
+
+        Only full SHAs are memoized: the store outlives a single job in the daemon, and symbolic refs
+        such as origin/main move between fetches, so they are looked up again on every call.
+        """
+        if rev in self.__resolved:
+            return self.__resolved[rev]
+        data = self.__cat_file(f"{rev}^{{commit}}", header_only=True)
+        resolved = data if data else rev
+        if FULL_SHA_PATTERN.match(rev):
+            self.__resolved[rev] = resolved
+        return resolved
+
+    def __cat_file(self, object_name: str, header_only: bool = False):
+        process = self.__ensure_process()
+        process.stdin.write(object_name.encode("utf-8") + b"\n")
+        process.stdin.flush()
+
+        header = process.stdout.readline().decode("utf-8").strip()
+        if not header or header.endswith("missing") or header.endswith("ambiguous"):
+            return None
+
+        sha, object_type, size = header.split()
+        content = process.stdout.read(int(size))
+        process.stdout.read(1)  # trailing newline after every object
+        if header_only:
+            return sha
+        if object_type != "blob":
+            return None
+        return content
+
+    def __ensure_process(self):
+        if self.__process is None or self.__process.poll() is not None:
+            Log.print_green(f"Starting git cat-file --batch in {self.repo_path or '.'}")
+            self.__process = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self.__process
@@ -1,6 +1,8 @@
+import base64
+import os
 import re
 import subprocess
-from typing import List
+from typing import Dict, List
 from log import Log
 
 class GitUtils:
@@ -11,9 +13,9 @@ class GitUtils:
         return re.split(r"(diff --git.*?)(?=diff --git|\Z)", diff_text, flags=re.DOTALL)[1::2]
     
     @staticmethod
-    def __run_subprocess(command):
+    def __run_subprocess(command, cwd: str = None):
         Log.print_green(command)
-        result = subprocess.run(command, stdout=subprocess.PIPE, text=True, encoding="utf-8")
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", cwd=cwd)
         if result.returncode == 0:
             return result.stdout
         else:
@@ -25,34 +27,122 @@ class GitUtils:
         return re.match(r'^[0-9a-f]{40}$', ref.lower()) is not None
 
     @staticmethod
-    def get_remote_name() -> str:
+    def get_remote_name(repo_path: str = None) -> str:
         command = ["git", "remote", "-v"]
-        result = GitUtils.__run_subprocess(command)
+        result = GitUtils.__run_subprocess(command, cwd=repo_path)
         lines = result.strip().splitlines()
         return lines[0].split()[0] if lines else "origin"
 
     @staticmethod
-    def get_last_commit_sha(file: str) -> str:
+    def get_last_commit_sha(file: str, repo_path: str = None) -> str:
         command = ["git", "log", "-1", "--format=%H", "--", file]
-        result = GitUtils.__run_subprocess(command)
+        result = GitUtils.__run_subprocess(command, cwd=repo_path)
         lines = result.strip().splitlines()
         return lines[0] if lines else ""
 
     @staticmethod
-    def get_diff_files(base_ref: str, head_ref: str) -> List[str]:
-        remote_name = GitUtils.get_remote_name()
-        base = base_ref if GitUtils.is_sha(base_ref) else f"{remote_name}/{base_ref}"
-        head = head_ref if GitUtils.is_sha(head_ref) else f"{remote_name}/{head_ref}"
+    def qualify_ref(ref: str, repo_path: str = None) -> str:
+        """SHAs are used as-is, branch names are looked up on the remote."""
+        if GitUtils.is_sha(ref):
+            return ref
+        return f"{GitUtils.get_remote_name(repo_path)}/{ref}"
+
+    @staticmethod
+    def get_diff_files(base_ref: str, head_ref: str, repo_path: str = None) -> List[str]:
+        base = GitUtils.qualify_ref(base_ref, repo_path)
+        head = GitUtils.qualify_ref(head_ref, repo_path)
 
         command = ["git", "diff", "--name-only", base, head]
-        result = GitUtils.__run_subprocess(command)
+        result = GitUtils.__run_subprocess(command, cwd=repo_path)
         return result.strip().splitlines()
 
     @staticmethod
-    def get_diff_in_file(base_ref: str, head_ref: str, file_path: str) -> str:
-        remote_name = GitUtils.get_remote_name()
-        base = base_ref if GitUtils.is_sha(base_ref) else f"{remote_name}/{base_ref}"
-        head = head_ref if GitUtils.is_sha(head_ref) else f"{remote_name}/{head_ref}"
+    def get_diff_in_file(base_ref: str, head_ref: str, file_path: str, repo_path: str = None) -> str:
+        base = GitUtils.qualify_ref(base_ref, repo_path)
+        head = GitUtils.qualify_ref(head_ref, repo_path)
 
         command = ["git", "diff", base, head, "--", file_path]
-        return GitUtils.__run_subprocess(command)
+        return GitUtils.__run_subprocess(command, cwd=repo_path)
+
+    @staticmethod
+    def get_numstat(base_ref: str, head_ref: str, repo_path: str = None) -> Dict[str, int]:
+        """Number of added + deleted lines per changed file (binary files count as 0)."""
+        base = GitUtils.qualify_ref(base_ref, repo_path)
+        head = GitUtils.qualify_ref(head_ref, repo_path)
+
+        command = ["git", "diff", "--numstat", "--no-renames", base, head]
+        result = GitUtils.__run_subprocess(command, cwd=repo_path)
+        changed_lines = {}
+        for line in result.strip().splitlines():
+            added, deleted, path = line.split("\t", 2)
+            changed_lines[path] = (int(added) if added.isdigit() else 0) + (int(deleted) if deleted.isdigit() else 0)
+        return changed_lines
+
+    @staticmethod
+    def commit_exists(ref: str, repo_path: str = None) -> bool:
+        result = subprocess.run(["git", "cat-file", "-e", f"{ref}^{{commit}}"], stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, cwd=repo_path)
+        return result.returncode == 0
+
+    @staticmethod
+    def rev_parse(ref: str, repo_path: str = None) -> str:
+        command = ["git", "rev-parse", "--verify", f"{ref}^{{commit}}"]
+        return GitUtils.__run_subprocess(command, cwd=repo_path).strip()
+
+    @staticmethod
+    def get_merge_base(first_ref: str, second_ref: str, repo_path: str = None) -> str:
+        command = ["git", "merge-base", first_ref, second_ref]
+        return GitUtils.__run_subprocess(command, cwd=repo_path).strip()
+
+    @staticmethod
+    def stream_log_patches(base_ref: str, head_ref: str, repo_path: str = None):
+        """Yields the lines of one zero-context `git log -p` over base..head, oldest commit first.
+
+        Merges are diffed against their first parent only, so a merge of many commits is one patch.
+        """
+        command = ["git", "log", "-p", "-U0", "--reverse", "--first-parent", "--diff-merges=first-parent",
+                   "--no-renames", "--no-color", "--format=commit %H", f"{base_ref}..{head_ref}"]
+        Log.print_green(command)
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, cwd=repo_path, text=True,
+                                   encoding="utf-8", errors="replace")
+        try:
+            yield from process.stdout
+        finally:
+            process.stdout.close()
+            if process.wait() != 0:
+                raise Exception(f"Error running {command}")
+
+    @staticmethod
+    def clone_or_fetch(clone_url: str, repo_path: str, refspecs: List[str]) -> str:
+        """Keeps a warm clone at `repo_path`: clones it once, afterwards only fetches the requested refs.
+
+        `clone_url` must not embed credentials; authenticate with `auth_env` instead.
+        """
+        if not os.path.isdir(os.path.join(repo_path, ".git")):
+            os.makedirs(os.path.dirname(repo_path) or ".", exist_ok=True)
+            GitUtils.__run_subprocess(["git", "clone", "--filter=blob:none", "--no-checkout", clone_url, repo_path])
+        else:
+            # Also replaces URLs with embedded credentials left behind by older clones.
+            GitUtils.__run_subprocess(["git", "remote", "set-url", "origin", clone_url], cwd=repo_path)
+
+        GitUtils.__run_subprocess(["git", "fetch", "--no-tags", "origin"] + refspecs, cwd=repo_path)
+        return repo_path
+
+    @staticmethod
+    def auth_env(token: str = None) -> dict:
+        """Git environment config sending `token` as an HTTP header to github.com.
+
+        Unlike a token in the remote URL it is not logged with commands, not included in error
+        messages and not written to .git/config; every git process inheriting it is authenticated
+        (including lazy blob fetches of partial clones).
+        """
+        if not token:
+            return {}
+        credentials = base64.b64encode(f"x-access-token:{token}".encode("utf-8")).decode("ascii")
+        return {
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.https://github.com/.extraheader",
+            "GIT_CONFIG_VALUE_0": f"AUTHORIZATION: basic {credentials}",
+            "GIT_TERMINAL_PROMPT": "0",
+        }
+
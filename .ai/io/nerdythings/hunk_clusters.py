@@ -0,0 +1,163 @@
+import difflib
+import hashlib
+import re
+from typing import List
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 4
+SIMILARITY_THRESHOLD = 0.8
+# Smaller hunks carry too little shape to tell apart safely, so they only cluster with byte-identical
+# changes (a one-line lint fix or dependency rename repeated across files), never through renaming/LSH.
+MIN_CLUSTER_TOKENS = 16
+# Members must also be this similar to the representative on the raw (un-normalized) changed tokens,
+# and carry exactly the same string/number literals (a different secret or status code is a different hunk).
+RAW_SIMILARITY_THRESHOLD = 0.7
+
+TOKEN_PATTERN = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`[^`]*`|\d+(?:\.\d+)?|[A-Za-z_$][\w$]*|\S")
+KEYWORDS = {
+    "if", "else", "for", "while", "return", "function", "def", "class", "import", "from", "const", "let", "var",
+    "new", "try", "catch", "except", "finally", "await", "async", "true", "false", "null", "None", "True", "False",
+    "this", "self", "public", "private", "static", "void", "in", "of", "and", "or", "not", "is", "with", "export",
+}
+
+MAX_HASH = (1 << 64) - 1
+
+
+class HunkCluster:
+
+    def __init__(self, representative, members: list):
+        self.representative = representative
+        self.members = members
+
+
+class HunkClusterIndex:
+    """Groups identical and near-identical hunks (MinHash + LSH) so each shape is reviewed once."""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+
+    @staticmethod
+    def changed_tokens(diff_text: str) -> List[str]:
+        """Raw tokens of the changed lines, each line prefixed by its `+`/`-` marker."""
+        tokens = []
+        for line in diff_text.splitlines():
+            if line.startswith(("+++", "---")) or line[:1] not in ("+", "-"):
+                continue
+            tokens.append(line[0])
+            tokens.extend(TOKEN_PATTERN.findall(line[1:]))
+        return tokens
+
+    @staticmethod
+    def normalize(raw_tokens: List[str]) -> List[str]:
+        """Renames identifiers consistently (ID0, ID1, ... by first use); keywords and literals are kept.
+
+        Two hunks normalize alike only when one is a pure renaming of the other, so a changed string,
+        number or condition keeps them apart.
+        """
+        names = {}
+        tokens = []
+        for token in raw_tokens:
+            if (token[0].isalpha() or token[0] in "_$") and token not in KEYWORDS:
+                tokens.append(names.setdefault(token, f"ID{len(names)}"))
+            else:
+                tokens.append(token)
+        return tokens
+
+    @staticmethod
+    def signature(tokens: List[str]) -> List[int]:
+        if len(tokens) < SHINGLE_SIZE:
+            shingles = {" ".join(tokens)}
+        else:
+            shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+        shingle_hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+        signature = []
+        for seed in range(NUM_PERMUTATIONS):
+            a = (seed * 0x9E3779B97F4A7C15 + 1) | 1
+            b = seed * 0xBF58476D1CE4E5B9
+            signature.append(min(((a * h + b) & MAX_HASH) for h in shingle_hashes))
+        return signature
+
+    @staticmethod
+    def similarity(left: List[int], right: List[int]) -> float:
+        return sum(1 for x, y in zip(left, right) if x == y) / NUM_PERMUTATIONS
+
+    @staticmethod
+    def raw_similarity(left: List[str], right: List[str]) -> float:
+        return difflib.SequenceMatcher(None, left, right, autojunk=False).ratio()
+
+    @staticmethod
+    def literals(raw_tokens: List[str]) -> List[str]:
+        return [token for token in raw_tokens if token[0] in "\"'`" or token[0].isdigit()]
+
+    def cluster(self, items: list, key=lambda item: item) -> List[HunkCluster]:
+        """Clusters `items` by the diff text returned from `key`; order of first appearance is kept."""
+        parents = list(range(len(items)))
+
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        def union(i, j):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parents[max(root_i, root_j)] = min(root_i, root_j)
+
+        def confirmed(representative, other):
+            return HunkClusterIndex.literals(raw[representative]) == HunkClusterIndex.literals(raw[other]) and \
+                HunkClusterIndex.raw_similarity(raw[representative], raw[other]) >= RAW_SIMILARITY_THRESHOLD
+
+        identical = {}
+        exact = {}
+        raw = []
+        signatures = []
+        for index, item in enumerate(items):
+            raw.append(HunkClusterIndex.changed_tokens(key(item)))
+            if not raw[index]:
+                signatures.append(None)
+                continue
+            raw_digest = hashlib.sha1("\x00".join(raw[index]).encode("utf-8")).hexdigest()
+            if raw_digest in identical:
+                union(index, identical[raw_digest])
+                signatures.append(None)
+                continue
+            identical[raw_digest] = index
+
+            tokens = HunkClusterIndex.normalize(raw[index])
+            if len(tokens) < MIN_CLUSTER_TOKENS:
+                signatures.append(None)
+                continue
+            digest = hashlib.sha1("\x00".join(tokens).encode("utf-8")).hexdigest()
+            if digest in exact and confirmed(exact[digest], index):
+                union(index, exact[digest])
+                signatures.append(None)
+                continue
+            exact.setdefault(digest, index)
+            signatures.append(HunkClusterIndex.signature(tokens))
+
+        rows = NUM_PERMUTATIONS // LSH_BANDS
+        buckets = {}
+        for index, signature in enumerate(signatures):
+            if signature is None:
+                continue
+            for band in range(LSH_BANDS):
+                bucket = (band, tuple(signature[band * rows:(band + 1) * rows]))
+                buckets.setdefault(bucket, []).append(index)
+
+        for candidates in buckets.values():
+            for other in candidates[1:]:
+                # Compare against the cluster's representative, not a chain of members, so clusters cannot drift.
+                representative = find(candidates[0])
+                if find(other) != representative and \
+                        HunkClusterIndex.similarity(signatures[representative], signatures[other]) >= self.threshold and \
+                        confirmed(representative, other):
+                    union(representative, other)
+
+        groups = {}
+        for index in range(len(items)):
+            groups.setdefault(find(index), []).append(items[index])
+
+        return [HunkCluster(representative=members[0], members=members) for members in groups.values()]
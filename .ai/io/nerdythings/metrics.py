@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+from log import Log
+
+
+class RunMetrics:
+    """Token, request and latency counters of one review run."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.wasted_tokens = 0
+        self.cancelled_requests = 0
+        self.latencies = []
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def record_request(self, prompt_tokens: int, completion_tokens: int, latency: float, cached_tokens: int = 0):
+        with self.__lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens or 0
+            self.completion_tokens += completion_tokens or 0
+            self.cached_tokens += cached_tokens or 0
+            self.latencies.append(latency)
+
+    def record_cancelled(self, wasted_tokens: int):
+        with self.__lock:
+            self.cancelled_requests += 1
+            self.wasted_tokens += wasted_tokens
+
+    def record_wasted(self, wasted_tokens: int):
+        with self.__lock:
+            self.wasted_tokens += wasted_tokens
+
+    def percentile(self, percent: float) -> float:
+        with self.__lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        index = min(len(latencies) - 1, max(0, int(round(percent / 100 * len(latencies) + 0.5)) - 1))
+        return latencies[index]
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "cancelled_requests": self.cancelled_requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "wasted_tokens": self.wasted_tokens,
+            "latency_p50": round(self.percentile(50), 3),
+            "latency_p95": round(self.percentile(95), 3),
+        }
+
+    def report(self):
+        """Prints the metrics and writes them to REVIEW_METRICS_PATH / the job summary when configured."""
+        data = self.as_dict()
+        Log.print_green("Run metrics: " + ", ".join(f"{key}={value}" for key, value in data.items()))
+
+        metrics_path = os.getenv("REVIEW_METRICS_PATH")
+        if metrics_path:
+            with open(metrics_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+
+        step_summary_path = os.getenv("GITHUB_STEP_SUMMARY")
+        if step_summary_path:
+            rows = "\n".join(f"| {key} | {value} |" for key, value in data.items())
+            with open(step_summary_path, "a", encoding="utf-8") as f:
+                f.write(f"### AI review metrics\n\n| Metric | Value |\n|---|---|\n{rows}\n")
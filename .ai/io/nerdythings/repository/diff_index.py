@@ -0,0 +1,101 @@
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+FILE_HEADER_PATTERN = re.compile(r"^diff --git a/(.*?) b/(.*)$")
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class IndexedHunk:
+
+    def __init__(self, new_start: int, new_length: int, header_index: int):
+        self.new_start = new_start
+        # A pure deletion (`+9,0`) covers no new-side line: new_end < new_start makes the interval empty.
+        self.new_end = new_start + new_length - 1
+        # Index of the `@@` line in the full diff.
+        self.header_index = header_index
+        self.line_count = 0
+        # New-file line number -> GitHub diff position (for `+` and context lines).
+        self.positions = {}
+
+
+class DiffPositionIndex:
+    """Per-file index of hunk ranges over one unified diff, parsed once per run.
+
+    Hunks of one file never overlap on the new side, so a sorted list of start lines searched with
+    bisect answers interval queries (line -> hunk, line -> diff position) in O(log n).
+    """
+
+    def __init__(self, diff_text: str):
+        self.lines = diff_text.splitlines()
+        self.__hunks: Dict[str, List[IndexedHunk]] = {}
+        self.__starts: Dict[str, List[int]] = {}
+        self.__build()
+
+    def hunk_for_line(self, file_path: str, line_number: int) -> Optional[IndexedHunk]:
+        starts = self.__starts.get(file_path)
+        if not starts:
+            return None
+        index = bisect_right(starts, line_number) - 1
+        if index < 0:
+            return None
+        hunk = self.__hunks[file_path][index]
+        return hunk if line_number <= hunk.new_end else None
+
+    def position_for_line(self, file_path: str, line_number: int) -> Optional[int]:
+        """GitHub review-comment `position` of a new-file line, or None when the line is not in the diff."""
+        hunk = self.hunk_for_line(file_path, line_number)
+        return hunk.positions.get(line_number) if hunk else None
+
+    def hunk_text(self, file_path: str, line_number: int, context_lines: int = 0) -> Optional[str]:
+        """The hunk containing `line_number` with `context_lines` extra diff lines on each side."""
+        hunk = self.hunk_for_line(file_path, line_number)
+        if hunk is None:
+            return None
+        start = max(0, hunk.header_index - context_lines)
+        end = min(len(self.lines), hunk.header_index + 1 + hunk.line_count + context_lines)
+        return "\n".join(self.lines[start:end])
+
+    def __build(self):
+        current_file = None
+        current_hunk = None
+        position = 0
+        new_line = 0
+
+        for index, line in enumerate(self.lines):
+            file_match = FILE_HEADER_PATTERN.match(line)
+            if file_match:
+                current_file = file_match.group(2)
+                self.__hunks.setdefault(current_file, [])
+                current_hunk = None
+                position = 0
+                continue
+
+            if current_file is None:
+                continue
+
+            hunk_match = HUNK_HEADER_PATTERN.match(line)
+            if hunk_match:
+                new_start = int(hunk_match.group(3))
+                new_length = int(hunk_match.group(4)) if hunk_match.group(4) is not None else 1
+                # GitHub positions count from the line after the first `@@` of the file.
+                if current_hunk is not None:
+                    position += 1
+                current_hunk = IndexedHunk(new_start, new_length, index)
+                self.__hunks[current_file].append(current_hunk)
+                new_line = new_start
+                continue
+
+            if current_hunk is None:
+                continue
+
+            position += 1
+            current_hunk.line_count += 1
+            prefix = line[:1]
+            if prefix in ("+", " ", ""):
+                current_hunk.positions[new_line] = position
+                new_line += 1
+
+        for file_path, hunks in self.__hunks.items():
+            hunks.sort(key=lambda hunk: hunk.new_start)
+            self.__starts[file_path] = [hunk.new_start for hunk in hunks]
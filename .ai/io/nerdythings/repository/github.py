@@ -1,7 +1,19 @@
+import threading
 import requests
 from log import Log
 from repository.repository import Repository, RepositoryError
-import re
+from repository.diff_index import DiffPositionIndex
+
+# One session per thread (daemon workers, supersede poller): connections are pooled and reused,
+# but requests.Session is not documented as thread-safe.
+_thread_local = threading.local()
+
+
+def _session() -> requests.Session:
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    return session
 
 
 class GitHub(Repository):
@@ -16,6 +28,10 @@ class GitHub(Repository):
         self.__header_authorization = {"Accept": "application/vnd.github.v3+json"}
         self.__url_add_comment = f"https://api.github.com/repos/{repo_owner}/{repo_name}/pulls/{pull_number}/comments"
         self.__url_add_issue = f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues/{pull_number}/comments"
+        self.__pull_request_etag = None
+        self.__pull_request_diff = None
+        self.__diff_index = None
+        self.__live_head_sha = None
 
     def update_comment(self, comment_id: str, new_body: str):
         """Cập nhật một comment trên PR bằng API GitHub."""
@@ -23,7 +39,7 @@ class GitHub(Repository):
         headers = self.__header_accept_json | self.__header_authorization
         body = {"body": new_body}
 
-        response = requests.patch(url, json=body, headers=headers)
+        response = _session().patch(url, json=body, headers=headers)
 
         if response.status_code == 200:
             return response.json()
@@ -33,7 +49,7 @@ class GitHub(Repository):
     def get_comments(self):
         """Lấy tất cả các comment trên PR."""
         headers = self.__header_accept_json | self.__header_authorization
-        response = requests.get(self.__url_add_issue, headers=headers)
+        response = _session().get(self.__url_add_issue, headers=headers)
 
         if response.status_code == 200:
             return response.json()
@@ -44,7 +60,7 @@ class GitHub(Repository):
         headers = self.__header_accept_json | self.__header_authorization
         body = {"body": text}
 
-        response = requests.post(self.__url_add_issue, json=body, headers=headers)
+        response = _session().post(self.__url_add_issue, json=body, headers=headers)
         if response.status_code in [200, 201]:
             return response.json()
         else:
@@ -55,7 +71,7 @@ class GitHub(Repository):
         url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/pulls?state=open"
         headers = self.__header_accept_json | self.__header_authorization
 
-        response = requests.get(url, headers=headers)
+        response = _session().get(url, headers=headers)
         if response.status_code == 200:
             pull_requests = response.json()
             if not pull_requests:
@@ -74,7 +90,7 @@ class GitHub(Repository):
             print(f"Checking for PR number: {self.pull_number} (type: {type(self.pull_number)})")
 
             commits_url = matching_pr["commits_url"]
-            commits_response = requests.get(commits_url, headers=headers)
+            commits_response = _session().get(commits_url, headers=headers)
             if commits_response.status_code == 200:
                 commits = commits_response.json()
                 if commits:
@@ -88,81 +104,87 @@ class GitHub(Repository):
         else:
             raise RepositoryError(f"Error fetching pull requests {response.status_code}: {response.text}")
 
+    def get_commit_comments(self, commit_sha: str):
+        url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/commits/{commit_sha}/comments"
+        headers = self.__header_accept_json | self.__header_authorization
+        response = _session().get(url, headers=headers)
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise RepositoryError(f"Error fetching commit comments {response.status_code}: {response.text}")
+
+    def post_commit_comment(self, commit_sha: str, text: str):
+        url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/commits/{commit_sha}/comments"
+        headers = self.__header_accept_json | self.__header_authorization
+        body = {"body": text}
+
+        response = _session().post(url, json=body, headers=headers)
+        if response.status_code in [200, 201]:
+            return response.json()
+        else:
+            raise RepositoryError(f"Error with commit comment {response.status_code} : {response.text}")
+
     def get_pull_request(self):
         url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/pulls/{self.pull_number}"
         headers = self.__header_accept_json | self.__header_authorization
-        response = requests.get(url, headers=headers)
+        response = _session().get(url, headers=headers)
         return response.json()
 
+    def get_live_head_sha(self) -> str:
+        """Returns the current head SHA of the PR using a conditional request (304s are not rate limited)."""
+        url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/pulls/{self.pull_number}"
+        headers = self.__header_accept_json | self.__header_authorization
+        if self.__pull_request_etag:
+            headers = headers | {"If-None-Match": self.__pull_request_etag}
+
+        response = _session().get(url, headers=headers)
+        if response.status_code == 304:
+            return self.__live_head_sha
+        if response.status_code == 200:
+            self.__pull_request_etag = response.headers.get("ETag")
+            self.__live_head_sha = response.json()["head"]["sha"]
+            return self.__live_head_sha
+        raise RepositoryError(f"Error fetching pull request head {response.status_code}: {response.text}")
+
     def update_pull_request(self, new_body):
         url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/pulls/{self.pull_number}"
         headers = self.__header_accept_json | self.__header_authorization
         data = {"body": new_body}
-        response = requests.patch(url, json=data, headers=headers)
+        response = _session().patch(url, json=data, headers=headers)
         return response.json()
 
     def _get_pull_request_diff(self):
-        """Lấy diff của pull request từ GitHub API."""
+        """Lấy diff của pull request từ GitHub API (tải một lần cho mỗi lần chạy)."""
+        if self.__pull_request_diff is not None:
+            return self.__pull_request_diff
+
         url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/pulls/{self.pull_number}"
         headers = {
             "Authorization": f"token {self.token}",
             "Accept": "application/vnd.github.v3.diff"
         }
-        response = requests.get(url, headers=headers)
+        response = _session().get(url, headers=headers)
 
         if response.status_code == 200:
-            return response.text
+            self.__pull_request_diff = response.text
+            return self.__pull_request_diff
         else:
             raise RepositoryError(f"Error getting diff: {response.status_code}")
 
+    def get_diff_index(self) -> DiffPositionIndex:
+        """Index of the PR diff for line -> hunk / diff position lookups, built once per run."""
+        if self.__diff_index is None:
+            self.__diff_index = DiffPositionIndex(self._get_pull_request_diff() or "")
+        return self.__diff_index
+
+    def get_diff_position(self, file_path, line_number):
+        """GitHub diff position of a new-file line, for review comments anchored to a line."""
+        return self.get_diff_index().position_for_line(file_path, line_number)
+
     def _extract_diff_hunk_for_line(self, file_path, line_number, context_lines=3):
         """Trích xuất diff hunk chứa dòng cụ thể, với context."""
-
-        diff_text = self._get_pull_request_diff()
-        if not diff_text:
-            return None
-
-        hunk_start_pattern = re.compile(r"@@ -(\d+),?(\d*) \+(\d+),?(\d*) @@")
-        lines = diff_text.splitlines()
-        current_hunk = None
-        hunk_lines = []
-        hunk_start_index = None
-
-        for i, line in enumerate(lines):
-            if line.startswith("diff --git") and file_path not in line:
-                continue
-            elif line.startswith("@@"):
-                match = hunk_start_pattern.match(line)
-                if match:
-                    old_start, old_length, new_start, new_length = match.groups()
-
-                    try:
-                        new_start = int(new_start)
-                        new_length = int(new_length) if new_length else 1
-                    except ValueError:
-                        print(f"Invalid number format in diff hunk: {line}")
-                        return None
-
-                    if new_start <= line_number <= new_start + new_length - 1:
-                        current_hunk = {
-                            "start": new_start,
-                            "lines": []
-                        }
-                        hunk_start_index = i
-                    else:
-                        current_hunk = None
-                    hunk_lines = []
-
-            elif current_hunk is not None:
-                hunk_lines.append(line)
-
-        if current_hunk and hunk_start_index is not None:
-            start_index = max(0, hunk_start_index - context_lines)
-            end_index = min(len(lines), hunk_start_index + len(hunk_lines) + context_lines)
-            context_hunk_lines = lines[start_index:end_index]
-            return "\n".join(context_hunk_lines)
-
-        return None
+        return self.get_diff_index().hunk_text(file_path, line_number, context_lines=context_lines)
 
     def _get_diff_hunk_for_line(self, file_path, line_number):
       """
@@ -179,4 +201,4 @@ class GitHub(Repository):
           return self._extract_diff_hunk_for_line(file_path, line_number)
       except RepositoryError as e:
           print(f"Lỗi khi lấy diff hunk: {e}")
-          return None
\ No newline at end of file
+          return None
@@ -0,0 +1,610 @@
+"""Review pipeline shared by the one-shot Action (github_reviewer.py), shard jobs and the daemon workers."""
+import copy
+import os
+import re
+import git
+from git_utils import GitUtils
+from commit_range import CommitRangeAttribution
+from diff_chunker import DiffChunker
+from hunk_clusters import HunkClusterIndex
+from checkpoint import ReviewCheckpoint
+from git_blob_store import GitBlobStore
+from metrics import RunMetrics
+from supersede import ReviewSuperseded, SupersedeWatcher
+from sharding import ReviewSharding
+from static_analysis import StaticAnalyzer
+from log import Log
+from ai.ai_bot import AiBot
+from ai.prompts import SUMMARY_PROMPT
+from repository.repository import RepositoryError
+
+PR_SUMMARY_COMMENT_IDENTIFIER = "<!-- PR SUMMARY COMMENT -->"
+PR_SUMMARY_FILES_IDENTIFIER = "<!-- PR SUMMARY FILES -->"
+OWNER_COMMENT_IDENTIFIER = "<!-- OWNER COMMENT -->"
+EXCLUDED_FOLDERS = {".ai/io/nerdythings", ".github/workflows"}
+PROTECTED_BRANCHES = set(os.getenv("PROTECTED_BRANCHES", "main,master").split(","))
+ZERO_SHA = "0" * 40
+
+def get_review_files(vars):
+    changed_files = GitUtils.get_diff_files(head_ref=vars.head_ref, base_ref=vars.base_ref, repo_path=vars.repo_path)
+    return [
+        file for file in changed_files
+        if not any(file.startswith(excluded) for excluded in EXCLUDED_FOLDERS)
+    ]
+
+def review_pull_request(vars, ai, github, blob_store=None, shard=None):
+    """Runs a full review of one pull request; shared by the one-shot Action, shard jobs and the daemon workers."""
+    changed_files = get_review_files(vars)
+    if not changed_files:
+        Log.print_green("No reviewable changes detected.")
+        if shard:
+            ReviewSharding.write_artifact(shard, vars.head_ref, [], {}, [], RunMetrics().as_dict())
+        return
+
+    if shard:
+        numstat = GitUtils.get_numstat(vars.base_ref, vars.head_ref, repo_path=vars.repo_path)
+        file_costs = {file: ReviewSharding.estimate_file_cost(numstat.get(file, 0)) for file in changed_files}
+        changed_files = ReviewSharding.partition_files(file_costs, shard.count)[shard.index]
+        Log.print_yellow(f"Shard {shard.index + 1}/{shard.count} reviews {len(changed_files)} file(s)")
+
+    Log.print_yellow(f"Filtered changed files: {changed_files}")
+
+    owns_blob_store = blob_store is None
+    blob_store = blob_store or GitBlobStore(vars.repo_path)
+    head_rev = GitUtils.qualify_ref(vars.head_ref, vars.repo_path)
+    checkpoint = ReviewCheckpoint.for_run(vars)
+    metrics = RunMetrics()
+    watcher = SupersedeWatcher(github, vars.head_ref)
+    watcher.start()
+
+    try:
+        file_summaries = summarize_files(changed_files, ai, blob_store, head_rev, checkpoint=checkpoint,
+                                         metrics=metrics, watcher=watcher)
+        if not shard:
+            update_pr_summary(github, file_summaries)
+
+        review_units = []
+        for file in changed_files:
+            review_units.extend(collect_review_units(file, vars, blob_store, head_rev))
+
+        static_comments, review_units = run_static_analysis(review_units, blob_store, head_rev)
+        if not shard:
+            post_comments(static_comments, github)
+
+        clusters = HunkClusterIndex().cluster(review_units, key=lambda unit: unit["chunk"].text)
+        Log.print_yellow(f"{len(review_units)} diff chunks grouped into {len(clusters)} review clusters")
+
+        findings = list(static_comments)
+        for cluster in clusters:
+            findings.extend(review_cluster(cluster, ai, github, checkpoint, metrics=metrics, watcher=watcher, post=not shard))
+
+        watcher.check()
+
+        if shard:
+            ReviewSharding.write_artifact(shard, vars.head_ref, changed_files, file_summaries, findings, metrics.as_dict())
+            return
+
+        #Generate and post the owner comment
+        owner_comment = generate_owner_comment(changed_files, github, vars)
+        if owner_comment:
+          post_or_update_owner_comment(github, owner_comment)
+    except ReviewSuperseded as e:
+        Log.print_yellow(f"Stopping review: {e}")
+    finally:
+        watcher.stop()
+        metrics.report()
+        if owns_blob_store:
+            blob_store.close()
+
+def review_push(vars, ai, github, blob_store=None):
+    """Reviews the before..after range of a push to a protected branch and posts commit comments.
+
+    The net diff of the range is reviewed, so hunks reverted or overwritten by a later commit of the
+    same push are never sent to the AI and every final hunk costs one request, however many commits
+    touched it. One `git log -p` stream then attributes each finding to the last commit that wrote it.
+    """
+    branch = vars.event_payload.get("ref", "").removeprefix("refs/heads/")
+    if branch not in PROTECTED_BRANCHES:
+        Log.print_yellow(f"Skipping push to {branch or 'unknown ref'}: not a protected branch.")
+        return
+    if vars.head_ref == ZERO_SHA:
+        Log.print_yellow(f"Branch {branch} was deleted, nothing to review.")
+        return
+
+    base_ref = resolve_push_base(vars)
+    if not base_ref:
+        Log.print_yellow(f"No base commit to compare {vars.head_ref} against, skipping review.")
+        return
+
+    push_vars = copy.copy(vars)
+    push_vars.base_ref = base_ref
+    changed_files = get_review_files(push_vars)
+    if not changed_files:
+        Log.print_green("No reviewable changes detected.")
+        return
+
+    owns_blob_store = blob_store is None
+    blob_store = blob_store or GitBlobStore(vars.repo_path)
+    checkpoint = ReviewCheckpoint.for_run(push_vars)
+    metrics = RunMetrics()
+
+    try:
+        attribution = CommitRangeAttribution.from_log(
+            GitUtils.stream_log_patches(base_ref, vars.head_ref, repo_path=vars.repo_path))
+
+        review_units = []
+        for file in changed_files:
+            review_units.extend(collect_review_units(file, push_vars, blob_store, vars.head_ref))
+
+        static_comments, review_units = run_static_analysis(review_units, blob_store, vars.head_ref)
+        clusters = HunkClusterIndex().cluster(review_units, key=lambda unit: unit["chunk"].text)
+        Log.print_yellow(f"{len(attribution.commits)} commit(s) in {base_ref[:12]}..{vars.head_ref[:12]}: "
+                         f"{len(review_units)} final diff chunks grouped into {len(clusters)} review clusters")
+
+        # Static findings are not tied to a chunk any more; they go on the pushed head.
+        comments_by_commit = {vars.head_ref: list(static_comments)} if static_comments else {}
+        for cluster in clusters:
+            unit = cluster.representative
+            unit_key = ReviewCheckpoint.unit_key(unit["file"], unit["chunk"].text)
+            findings = checkpoint.get_findings(unit_key)
+            if findings is None:
+                findings = request_cluster_findings(cluster, ai, metrics=metrics)
+                if findings is None:
+                    continue
+                checkpoint.record_findings(unit_key, findings)
+            if not findings:
+                continue
+
+            commit = attribution.commit_for_lines(unit["file"], unit["chunk"].added_line_numbers, default=vars.head_ref)
+            comments_by_commit.setdefault(commit, []).extend(findings)
+
+        for commit, comment_texts in comments_by_commit.items():
+            post_commit_comments(comment_texts, commit, github)
+    finally:
+        metrics.report()
+        if owns_blob_store:
+            blob_store.close()
+
+def resolve_push_base(vars):
+    """Base of the pushed range: the fork point with `before`, so force-pushes only review new commits."""
+    if vars.base_ref != ZERO_SHA and GitUtils.commit_exists(vars.base_ref, repo_path=vars.repo_path):
+        return GitUtils.get_merge_base(vars.base_ref, vars.head_ref, repo_path=vars.repo_path)
+
+    # New branch, or `before` was rewritten away and is not in the clone: review the head commit alone.
+    # Resolved to a SHA, since qualify_ref would treat "<sha>~1" as a branch name.
+    parent = f"{vars.head_ref}~1"
+    if not GitUtils.commit_exists(parent, repo_path=vars.repo_path):
+        return None
+    return GitUtils.rev_parse(parent, repo_path=vars.repo_path)
+
+def post_commit_comments(comment_texts, commit_sha, github):
+    try:
+        existing_comment_bodies = {c['body'] for c in github.get_commit_comments(commit_sha)}
+    except RepositoryError as e:
+        Log.print_red(f"Failed to fetch comments of {commit_sha}: {e}")
+        return
+
+    for comment_text in comment_texts:
+        if not comment_text or comment_text in existing_comment_bodies:
+            Log.print_yellow(f"Skipping comment on {commit_sha[:12]}: empty or already exists")
+            continue
+
+        Log.print_yellow(f"Posting commit comment on {commit_sha[:12]}:\n{comment_text}")
+        try:
+            github.post_commit_comment(commit_sha, comment_text)
+            existing_comment_bodies.add(comment_text)
+        except RepositoryError as e:
+            Log.print_red(f"Failed to post commit comment: {e}")
+
+def merge_shard_results(vars, github, shard_dir):
+    """Final step of a sharded review: one summary table, one owner comment, deduplicated findings."""
+    artifacts = ReviewSharding.load_artifacts(shard_dir, head_sha=vars.head_ref)
+    if not artifacts:
+        Log.print_red(f"No shard artifacts for {vars.head_ref} found in {shard_dir}.")
+        return
+
+    # A superseded shard exits without an artifact; never post a partial review.
+    missing = sorted(set(range(artifacts[0]["shard_count"])) - {artifact["shard_index"] for artifact in artifacts})
+    if missing:
+        Log.print_red(f"Missing artifacts of shard(s) {missing} for {vars.head_ref}, not posting a partial review.")
+        return
+
+    try:
+        SupersedeWatcher(github, vars.head_ref).check()
+    except ReviewSuperseded as e:
+        Log.print_yellow(f"Not posting merged review: {e}")
+        return
+
+    changed_files = []
+    file_summaries = {}
+    findings = []
+    seen_findings = set()
+    for artifact in artifacts:
+        changed_files.extend(artifact["files"])
+        file_summaries.update(artifact["summaries"])
+        for finding in artifact["findings"]:
+            if finding not in seen_findings:
+                seen_findings.add(finding)
+                findings.append(finding)
+
+    total_tokens = sum(artifact["metrics"].get("total_tokens", 0) for artifact in artifacts)
+    Log.print_green(f"Merging {len(artifacts)} shard(s): {len(changed_files)} files, {len(findings)} findings, {total_tokens} tokens")
+
+    if not changed_files:
+        Log.print_green("All changed files are excluded from review.")
+        return
+
+    update_pr_summary(github, {file: file_summaries[file] for file in changed_files if file in file_summaries})
+    post_comments(findings, github)
+
+    owner_comment = generate_owner_comment(changed_files, github, vars)
+    if owner_comment:
+      post_or_update_owner_comment(github, owner_comment)
+
+
+
+def generate_summary_table(file_summaries):
+    """Creates a PR Summary table as a Markdown string."""
+    table_header = "| <div style='width:40%'>Files</div> | <div style='width:60%'>Business Summary</div> |\n|---------------------|-------------------------------------|"
+    table_rows = []
+
+    for file, summary in file_summaries.items():
+        file_escaped = str(file).replace("|", "|").replace("*", "*").replace("_", "_").replace("\n", "<br>")
+        summary_escaped = str(summary).replace("|", "|").replace("*", "*").replace("_", "_").replace("\n", "<br>")
+        
+        summary_escaped = re.sub(r"^\s*[-•]\s*", "", summary_escaped, flags=re.MULTILINE)
+
+        row = f"| {file_escaped} | {summary_escaped} |"
+        table_rows.append(row)
+
+    if not table_rows:
+        return "No summaries available."
+
+    return "\n".join([table_header] + table_rows)
+
+
+def summarize_files(changed_files, ai, blob_store, head_rev, checkpoint=None, metrics=None, watcher=None):
+    """Asks the AI for a short summary of each changed file."""
+    file_summaries = {}
+    for file in changed_files:
+        if checkpoint and checkpoint.get_summary(file) is not None:
+            file_summaries[file] = checkpoint.get_summary(file)
+            continue
+
+        if watcher:
+            watcher.check()
+
+        try:
+            content = blob_store.read_prefix(head_rev, file, 1500)
+            if content is None:
+                raise FileNotFoundError(file)
+            new_summary = ai.ai_request_summary(file_changes={file:content}, summary_prompt=SUMMARY_PROMPT, metrics=metrics)
+            file_summaries[file] = new_summary
+            if checkpoint and not AiBot.is_error_text(new_summary):
+                checkpoint.record_summary(file, new_summary)
+        except FileNotFoundError:
+            Log.print_yellow(f"File not found: {file}")
+            file_summaries[file] = f"File not found: {file}"
+        except Exception as e:
+            Log.print_red(f"Error processing file {file}: {e}")
+            file_summaries[file] = f"Error processing file {file}: {e}"
+
+    if watcher:
+        watcher.check()
+
+    return file_summaries
+
+def update_pr_summary(github, new_summaries):
+    Log.print_green("Updating PR description...")
+
+    pr_data = github.get_pull_request()
+    current_body = pr_data.get("body") or ""
+
+    # Extract existing summaries from the PR body
+    existing_summaries = {}
+    summary_table_match = re.search(f"{PR_SUMMARY_COMMENT_IDENTIFIER}.*?\n(.*?)(\n{PR_SUMMARY_FILES_IDENTIFIER}|\n{OWNER_COMMENT_IDENTIFIER}|\n\n)", current_body, re.DOTALL)
+    if summary_table_match:
+        summary_table_markdown = summary_table_match.group(1).strip()
+        # Parse the markdown table to extract existing summaries
+        existing_summaries = parse_summary_table(summary_table_markdown) # Function to parse is created below
+    else:
+        Log.print_yellow("No existing summary table found.")
+
+    file_summaries = existing_summaries.copy()  # Start with existing summaries
+    file_summaries.update(new_summaries)
+
+    summary_table = generate_summary_table(file_summaries)
+    files_comment = "" #Empty this out since we removed the files storing
+
+
+    if PR_SUMMARY_COMMENT_IDENTIFIER in current_body:
+        updated_body = re.sub(
+            f"{PR_SUMMARY_COMMENT_IDENTIFIER}.*",
+            f"{PR_SUMMARY_COMMENT_IDENTIFIER}\n## Summary by BAP_Review\n\n{summary_table}\n{files_comment}",
+            current_body,
+            flags=re.DOTALL
+        )
+    else:
+        updated_body = f"{PR_SUMMARY_COMMENT_IDENTIFIER}\n## Summary by BAP_Review\n\n{summary_table}\n{files_comment}\n\n{current_body}"
+
+    try:
+        github.update_pull_request(updated_body)
+        Log.print_yellow("PR description updated successfully!")
+    except RepositoryError as e:
+        Log.print_red(f"Failed to update PR description: {e}")
+
+    return file_summaries #Returning for the owner comment
+
+def parse_summary_table(markdown_table):
+    """Parses the summary table from markdown to extract existing summaries."""
+    file_summaries = {}
+    rows = markdown_table.strip().split('\n')
+
+    # Check if there is a header row and a separator row:
+    if len(rows) < 3:
+        return file_summaries
+
+    # Check if it is a valid markdown table
+    if not rows[1].startswith("|---"):
+        return file_summaries
+
+    #Skip the header and separator row
+    for row in rows[2:]:
+        parts = row.split('|')
+        if len(parts) != 3:  # Expecting | File | Summary |
+            continue
+
+        file_name = parts[1].strip()
+        summary = parts[2].strip()
+
+        # Unescape markdown characters:
+        file_name = file_name.replace("\\|", "|").replace("\\*", "*").replace("\\_", "_").replace("<br>", "\n")
+        summary = summary.replace("\\|", "|").replace("\\*", "*").replace("\\_", "_").replace("<br>", "\n")
+
+        file_summaries[file_name] = summary
+
+    return file_summaries
+
+def collect_review_units(file, vars, blob_store, head_rev):
+    """Reads a changed file at the head revision and splits its diff into review units (one per diff chunk)."""
+    Log.print_green(f"Collecting diff chunks for: {file}")
+    file_content = blob_store.read_text(head_rev, file)
+    if file_content is None:
+        Log.print_yellow(f"File not found: {file}")
+        return []
+
+    file_diffs = GitUtils.get_diff_in_file(head_ref=vars.head_ref, base_ref=vars.base_ref, file_path=file, repo_path=vars.repo_path)
+    if not file_diffs:
+        Log.print_red(f"No diffs found for: {file}")
+        return []
+
+    chunks = DiffChunker().chunk_file_diff(file_diffs, file_path=file, file_content=file_content)
+    Log.print_yellow(f"base_ref: {vars.base_ref}, head_ref: {vars.head_ref}, file: {file}, chunks: {len(chunks)}")
+
+    return [{"file": file, "chunk": chunk} for chunk in chunks]
+
+def run_static_analysis(review_units, blob_store, head_rev):
+    """Local analyzer pre-pass on changed lines.
+
+    Returns the rendered deterministic findings and the units that still need the LLM; units whose
+    added lines are all flagged are dropped, the others carry the analyzer output as compact context.
+    """
+    changed_lines = {}
+    for unit in review_units:
+        changed_lines.setdefault(unit["file"], set()).update(unit["chunk"].added_line_numbers)
+
+    static_findings = StaticAnalyzer(blob_store, head_rev).analyze(changed_lines)
+    if not static_findings:
+        return [], review_units
+
+    comments = []
+    for file, file_findings in static_findings.items():
+        for finding in file_findings:
+            source_line = (blob_store.read_lines(head_rev, file, finding.line, finding.line) or [""])[0].rstrip("\n")
+            comments.append(StaticAnalyzer.render(file, finding, source_line))
+
+    remaining_units = []
+    for unit in review_units:
+        added_lines = set(unit["chunk"].added_line_numbers)
+        unit_findings = [finding for finding in static_findings.get(unit["file"], []) if finding.line in added_lines]
+        flagged_lines = {finding.line for finding in unit_findings}
+        if unit_findings and added_lines <= flagged_lines:
+            Log.print_green(f"Skipping AI review of {unit['file']}:{unit['chunk'].new_start}-{unit['chunk'].new_end}, explained by static analysis.")
+            continue
+        unit["static_analysis"] = "\n".join(finding.compact() for finding in unit_findings)
+        remaining_units.append(unit)
+
+    return comments, remaining_units
+
+def review_cluster(cluster, ai, github, checkpoint=None, metrics=None, watcher=None, post=True):
+    """Reviews the representative of a hunk cluster and fans the findings out to every member.
+
+    Returns the findings; they are posted right away unless `post` is False (shard jobs).
+    """
+    unit = cluster.representative
+    file = unit["file"]
+    chunk = unit["chunk"]
+    unit_key = ReviewCheckpoint.unit_key(file, chunk.text)
+
+    findings = checkpoint.get_findings(unit_key) if checkpoint else None
+    if findings is not None:
+        Log.print_green(f"Skipping AI review of {file}:{chunk.new_start}-{chunk.new_end}, already done in checkpoint.")
+    else:
+        if watcher:
+            watcher.check()
+        tokens_before = metrics.total_tokens if metrics else 0
+        findings = request_cluster_findings(cluster, ai, metrics=metrics, cancel_event=watcher.cancel_event if watcher else None)
+        if watcher and watcher.superseded:
+            # The answer is about a stale head; drop it instead of posting it.
+            if metrics:
+                metrics.record_wasted(metrics.total_tokens - tokens_before)
+            watcher.check()
+        if findings is None:
+            return []
+        if checkpoint:
+            checkpoint.record_findings(unit_key, findings)
+
+    if post:
+        if watcher:
+            watcher.check()
+        post_comments(findings, github, checkpoint=checkpoint, unit_key=unit_key)
+    return findings
+
+def request_cluster_findings(cluster, ai, metrics=None, cancel_event=None):
+    """Returns the comment texts for a cluster, [] when the AI found nothing, or None when the request failed."""
+    unit = cluster.representative
+    file = unit["file"]
+    chunk = unit["chunk"]
+    Log.print_green(f"Reviewing {file}:{chunk.new_start}-{chunk.new_end} ({len(cluster.members)} similar chunk(s))")
+
+    diff_data = {
+        "file_path": file,
+        "code": chunk.text,
+        "severity": "Warning",
+        "type": "General",
+        "issue_description": "Potential issue",
+        "line_numbers": f"{chunk.new_start}-{chunk.new_end}" if chunk.hunks else "N/A",
+        "changed_lines": chunk.changed_lines or "N/A",
+        "explanation": "",
+        "context": chunk.context,
+        "static_analysis": unit.get("static_analysis", ""),
+    }
+    Log.print_yellow(f"Diff data being sent to AI: {diff_data}")
+
+    try:
+        response = ai.ai_request_diffs(code=chunk.outline, diffs=diff_data, metrics=metrics, cancel_event=cancel_event)
+    except ReviewSuperseded:
+        raise
+    except Exception as e:
+        Log.print_red(f"Error during AI request: {e}")
+        return None
+
+    if response and AiBot.is_error_text(response):
+        Log.print_red(f"AI request failed for {file}: {response}")
+        return None
+
+    if not response or AiBot.is_no_issues_text(response):
+        Log.print_green(f"No critical issues found in diff chunk, skipping comments.")
+        return []
+
+    comments = AiBot.review_comments(response, chunk.text, file_path=file)
+    also_applies_to = format_cluster_members(cluster.members[1:])
+    return [comment.text.strip() + also_applies_to for comment in comments if comment.text]
+
+def format_cluster_members(members):
+    if not members:
+        return ""
+
+    locations = "\n".join(
+        f"- {member['file']}:{member['chunk'].new_start}-{member['chunk'].new_end}" for member in members
+    )
+    return f"\n\n**Also applies to {len(members)} similar change(s):**\n{locations}"
+
+def post_comments(comment_texts, github, checkpoint=None, unit_key=None):
+    if not comment_texts:
+        return
+
+    existing_comments = github.get_comments()
+    existing_comment_bodies = {c['body'] for c in existing_comments}
+    for index, comment_text in enumerate(comment_texts):
+        if checkpoint and checkpoint.is_posted(unit_key, index):
+            continue
+
+        if not comment_text:
+            Log.print_yellow(f"Skipping comment because no content.")
+            continue
+
+        if comment_text in existing_comment_bodies:
+            Log.print_yellow(f"Skipping comment: Comment already exists")
+            if checkpoint:
+                checkpoint.record_posted(unit_key, index, None)
+            continue
+
+        Log.print_yellow(f"Posting general comment:\n{comment_text}")
+        try:
+            posted = github.post_comment_general(
+                text=comment_text
+            )
+            if checkpoint:
+                checkpoint.record_posted(unit_key, index, posted.get("id"))
+        except RepositoryError as e:
+            Log.print_red(f"Failed to post review comment: {e}")
+        except Exception as e:
+            Log.print_red(f"Unexpected error: {e}")
+
+
+def parse_ai_suggestions(response):
+    if not response:
+        return []
+
+    suggestions = []
+    for suggestion_text in response.split("\n\n"):
+        suggestion_text = suggestion_text.strip()
+        if suggestion_text:
+            suggestions.append({"text": suggestion_text})
+    return suggestions
+
+def generate_owner_comment(changed_files, github, vars):
+    """Generates the owner's comment with dropdowns for each changed file."""
+
+    comment = f"{OWNER_COMMENT_IDENTIFIER}\n## Owner's Review Notes\n"
+    comment += "<details>\n"
+    comment += "  <summary><b>List Change History</b></summary>\n\n"
+
+    for file in changed_files:
+        try:
+            repo = git.Repo(vars.repo_path)
+            # Remote-tracking ref: a local `main` is only created at clone time and goes stale in warm clones.
+            try:
+                base_branch = GitUtils.qualify_ref('main', vars.repo_path)
+                repo.git.rev_parse('--verify', base_branch)
+            except git.exc.GitCommandError:
+                base_branch = GitUtils.qualify_ref(vars.base_ref, vars.repo_path)
+
+            diff = repo.git.diff(base_branch, vars.head_ref, '--', file)
+
+            comment += "  <details>\n"
+            comment += f"    <summary><b>{file}</b></summary>\n\n"
+
+            comment += "    <ul>\n"
+            for line in diff.splitlines():
+                comment += f"      <li><code>{line}</code></li>\n"
+            comment += "    </ul>\n\n"
+
+            comment += "    **Impact:** (Summary of impact needs to be manually added here)\n\n" #Manually added because you need domain knowledge to do so
+
+            comment += "  </details>\n\n"
+
+        except Exception as e:
+            Log.print_red(f"Error generating diff for owner comment: {e}")
+            comment += f"  <details>\n"
+            comment += f"    <summary><b>{file}</b> - Error generating diff</summary>\n\n"
+            comment += f"    Error: {e}\n\n"
+            comment += "  </details>\n\n"
+
+    comment += "</details>\n"
+    return comment
+
+def post_or_update_owner_comment(github, comment):
+    """Posts a new comment or updates an existing one."""
+    existing_comments = github.get_comments()
+    owner_comment_exists = False
+
+    for existing_comment in existing_comments:
+        if OWNER_COMMENT_IDENTIFIER in existing_comment['body']:
+            Log.print_yellow("Updating existing owner comment...")
+            try:
+                github.update_comment(existing_comment['id'], comment)
+                Log.print_green("Owner comment updated successfully!")
+            except RepositoryError as e:
+                Log.print_red(f"Failed to update owner comment: {e}")
+            owner_comment_exists = True
+            break
+
+    if not owner_comment_exists:
+        Log.print_yellow("Posting new owner comment...")
+        try:
+            github.post_comment_general(comment)
+            Log.print_green("Owner comment posted successfully!")
+        except RepositoryError as e:
+            Log.print_red(f"Failed to post owner comment: {e}")
@@ -0,0 +1,224 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from log import Log
+from env_vars import EnvVars
+from git_utils import GitUtils
+from git_blob_store import GitBlobStore
+from ai.chat_gpt import ChatGPT
+from repository.github import GitHub
+from review_pipeline import review_pull_request
+
+THROUGHPUT_WINDOW_SECONDS = 3600
+
+
+class FairJobQueue:
+    """Round-robin queue over repositories; at most one job per repository runs at a time.
+
+    A newer event for a pull request that is still queued replaces the older one,
+    so a burst of pushes is reviewed once at the latest head.
+    """
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__jobs = {}
+        self.__rotation = deque()
+        self.__running = set()
+
+    def put(self, repo_key: str, job_key: str, job: dict):
+        with self.__condition:
+            jobs = self.__jobs.setdefault(repo_key, OrderedDict())
+            if job_key in jobs:
+                Log.print_yellow(f"Replacing queued job {job_key} with a newer event.")
+            jobs[job_key] = job
+            if repo_key not in self.__rotation:
+                self.__rotation.append(repo_key)
+            self.__condition.notify()
+
+    def get(self):
+        with self.__condition:
+            while True:
+                for _ in range(len(self.__rotation)):
+                    repo_key = self.__rotation.popleft()
+                    jobs = self.__jobs.get(repo_key)
+                    if not jobs:
+                        self.__jobs.pop(repo_key, None)
+                        continue
+                    self.__rotation.append(repo_key)
+                    if repo_key in self.__running:
+                        continue
+                    _, job = jobs.popitem(last=False)
+                    self.__running.add(repo_key)
+                    return repo_key, job
+                self.__condition.wait()
+
+    def done(self, repo_key: str):
+        with self.__condition:
+            self.__running.discard(repo_key)
+            self.__condition.notify_all()
+
+    def size(self) -> int:
+        with self.__condition:
+            return sum(len(jobs) for jobs in self.__jobs.values())
+
+
+class ReviewService:
+    """Webhook daemon: accepts PR events over HTTP and reviews them with warm clients and clones."""
+
+    def __init__(self, host: str, port: int, workers: int, workspace_dir: str):
+        self.host = host
+        self.port = port
+        self.workers = max(workers, 1)
+        self.workspace_dir = os.path.abspath(workspace_dir)
+        self.webhook_secret = os.getenv("WEBHOOK_SECRET")
+        self.queue = FairJobQueue()
+        self.__ai_clients = {}
+        self.__blob_stores = {}
+        self.__ai_lock = threading.Lock()
+        self.__stats_lock = threading.Lock()
+        self.__completed = deque()
+        self.__failed = 0
+        self.__started_at = time.time()
+        # Process-wide so fetches, diffs and the cat-file processes of the blob stores are all authenticated.
+        os.environ.update(GitUtils.auth_env(os.getenv("GITHUB_TOKEN")))
+
+    def serve_forever(self):
+        for index in range(self.workers):
+            threading.Thread(target=self.__work, name=f"review-worker-{index}", daemon=True).start()
+
+        service = self
+
+        class WebhookHandler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, response = service.handle_webhook(self.headers, body)
+                self.__reply(status, response)
+
+            def do_GET(self):
+                if self.path.rstrip("/") in ("/healthz", "/metrics"):
+                    self.__reply(200, service.stats())
+                else:
+                    self.__reply(404, {"error": "not found"})
+
+            def __reply(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                Log.print_green(f"[webhook] {format % args}")
+
+        server = ThreadingHTTPServer((self.host, self.port), WebhookHandler)
+        Log.print_green(f"Reviewer service listening on http://{self.host}:{self.port} with {self.workers} workers")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+
+    def handle_webhook(self, headers, body: bytes):
+        if self.webhook_secret and not self.__verify_signature(headers.get("X-Hub-Signature-256", ""), body):
+            return 401, {"error": "invalid signature"}
+
+        event_name = headers.get("X-GitHub-Event", "pull_request")
+        if event_name != "pull_request":
+            return 202, {"status": "ignored", "event": event_name}
+
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError:
+            return 400, {"error": "payload is not valid JSON"}
+
+        if payload.get("action") not in ("opened", "reopened", "synchronize"):
+            return 202, {"status": "ignored", "action": payload.get("action")}
+
+        try:
+            repo = payload["pull_request"]["base"]["repo"]
+            repo_key = repo["full_name"]
+            job_key = f"{repo_key}#{payload['pull_request']['number']}"
+        except (KeyError, TypeError):
+            return 400, {"error": "payload is not a pull_request event"}
+
+        self.queue.put(repo_key, job_key, {"event_name": event_name, "payload": payload, "received_at": time.time()})
+        return 202, {"status": "queued", "job": job_key, "queued": self.queue.size()}
+
+    def stats(self) -> dict:
+        with self.__stats_lock:
+            now = time.time()
+            while self.__completed and now - self.__completed[0] > THROUGHPUT_WINDOW_SECONDS:
+                self.__completed.popleft()
+            window = min(now - self.__started_at, THROUGHPUT_WINDOW_SECONDS)
+            return {
+                "queued": self.queue.size(),
+                "workers": self.workers,
+                "completed_last_hour": len(self.__completed),
+                "failed": self.__failed,
+                "prs_per_minute": round(len(self.__completed) / max(window / 60, 1 / 60), 2),
+            }
+
+    def __verify_signature(self, signature: str, body: bytes) -> bool:
+        expected = "sha256=" + hmac.new(self.webhook_secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def __work(self):
+        while True:
+            repo_key, job = self.queue.get()
+            try:
+                started = time.time()
+                vars = self.__prepare_job(repo_key, job)
+                github = GitHub(vars.token, vars.owner, vars.repo, vars.pull_number)
+                review_pull_request(vars, self.__ai_client(vars.chat_gpt_token, vars.chat_gpt_model), github,
+                                    blob_store=self.__blob_store(vars.repo_path))
+                with self.__stats_lock:
+                    self.__completed.append(time.time())
+                Log.print_green(f"Reviewed {repo_key}#{vars.pull_number} in {time.time() - started:.1f}s "
+                                f"(waited {started - job['received_at']:.1f}s in queue)")
+            except Exception as e:
+                with self.__stats_lock:
+                    self.__failed += 1
+                Log.print_red(f"Review job for {repo_key} failed: {e}")
+                print(traceback.format_exc())
+            finally:
+                self.queue.done(repo_key)
+
+    def __prepare_job(self, repo_key: str, job: dict) -> EnvVars:
+        """Brings the cached clone of the repository up to date with the PR refs (contents are read from git objects)."""
+        payload = job["payload"]
+        pr = payload["pull_request"]
+        repo_path = os.path.join(self.workspace_dir, *repo_key.split("/"))
+        clone_url = f"https://github.com/{repo_key}.git"
+
+        base_branch = pr["base"]["ref"]
+        refspecs = [
+            f"+refs/heads/{base_branch}:refs/remotes/origin/{base_branch}",
+            f"+refs/pull/{pr['number']}/head:refs/remotes/origin/pr/{pr['number']}",
+        ]
+        if payload.get("before") and GitUtils.is_sha(payload["before"]):
+            refspecs.append(payload["before"])
+        GitUtils.clone_or_fetch(clone_url, repo_path, refspecs)
+
+        vars = EnvVars(event_name=job["event_name"], event_payload=payload, repo_path=repo_path)
+        vars.check_vars()
+        return vars
+
+    def __blob_store(self, repo_path: str) -> GitBlobStore:
+        with self.__ai_lock:
+            if repo_path not in self.__blob_stores:
+                self.__blob_stores[repo_path] = GitBlobStore(repo_path)
+            return self.__blob_stores[repo_path]
+
+    def __ai_client(self, token: str, model: str) -> ChatGPT:
+        with self.__ai_lock:
+            key = (token, model)
+            if key not in self.__ai_clients:
+                self.__ai_clients[key] = ChatGPT(token, model)
+            return self.__ai_clients[key]
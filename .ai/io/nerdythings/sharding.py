@@ -0,0 +1,74 @@
+import glob
+import json
+import os
+from typing import Dict, List
+from log import Log
+
+DEFAULT_SHARD_DIR = ".ai_review_shards"
+# Fixed per-file cost in tokens (summary request + system prompt) on top of the diff itself.
+FILE_OVERHEAD_TOKENS = 800
+TOKENS_PER_CHANGED_LINE = 12
+
+
+class ShardSpec:
+
+    def __init__(self, index: int, count: int, output_dir: str = DEFAULT_SHARD_DIR):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Invalid shard {index} of {count}")
+        self.index = index
+        self.count = count
+        self.output_dir = output_dir
+
+    @property
+    def artifact_path(self) -> str:
+        return os.path.join(self.output_dir, f"shard-{self.index}.json")
+
+
+class ReviewSharding:
+    """Deterministic, cost-balanced partitioning of changed files across matrix jobs."""
+
+    @staticmethod
+    def estimate_file_cost(changed_lines: int) -> int:
+        return FILE_OVERHEAD_TOKENS + TOKENS_PER_CHANGED_LINE * changed_lines
+
+    @staticmethod
+    def partition_files(file_costs: Dict[str, int], shard_count: int) -> List[List[str]]:
+        """Longest-processing-time first: biggest files go to the currently lightest shard.
+
+        Ties are broken by file name and shard index, so every matrix job computes the same plan.
+        """
+        shards = [[] for _ in range(shard_count)]
+        loads = [0] * shard_count
+        for file, cost in sorted(file_costs.items(), key=lambda item: (-item[1], item[0])):
+            target = min(range(shard_count), key=lambda index: (loads[index], index))
+            shards[target].append(file)
+            loads[target] += cost
+        Log.print_yellow(f"Shard loads (estimated tokens): {loads}")
+        return shards
+
+    @staticmethod
+    def write_artifact(spec: ShardSpec, head_sha: str, files: list, summaries: dict, findings: list, metrics: dict):
+        os.makedirs(spec.output_dir, exist_ok=True)
+        with open(spec.artifact_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "shard_index": spec.index,
+                "shard_count": spec.count,
+                "head_sha": head_sha,
+                "files": files,
+                "summaries": summaries,
+                "findings": findings,
+                "metrics": metrics,
+            }, f, indent=2)
+        Log.print_green(f"Wrote shard artifact {spec.artifact_path} ({len(files)} files, {len(findings)} findings)")
+
+    @staticmethod
+    def load_artifacts(shard_dir: str, head_sha: str = None) -> List[dict]:
+        artifacts = []
+        for path in sorted(glob.glob(os.path.join(shard_dir, "**", "shard-*.json"), recursive=True)):
+            with open(path, "r", encoding="utf-8") as f:
+                artifact = json.load(f)
+            if head_sha and artifact.get("head_sha") != head_sha:
+                Log.print_yellow(f"Ignoring {path}: built for {artifact.get('head_sha')}, not {head_sha}")
+                continue
+            artifacts.append(artifact)
+        return sorted(artifacts, key=lambda artifact: artifact["shard_index"])
@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Set
+from log import Log
+
+ENABLED_ANALYZERS = set(os.getenv("STATIC_ANALYZERS", "python,ruff,node").split(","))
+ANALYZER_TIMEOUT_SECONDS = 30
+MAX_WORKERS = int(os.getenv("STATIC_ANALYSIS_WORKERS", "8"))
+
+NODE_ERROR_LOCATION_PATTERN = re.compile(r":(\d+)\s*$")
+
+
+class StaticFinding:
+
+    def __init__(self, line: int, tool: str, code: str, message: str, blocking: bool = False):
+        self.line = line
+        self.tool = tool
+        self.code = code
+        self.message = message
+        # Blocking findings (syntax errors) are posted as critical and de-duplicated per line across tools.
+        # They do not skip the LLM: a chunk is dropped only when every added line carries a finding.
+        self.blocking = blocking
+
+    def compact(self) -> str:
+        return f"L{self.line} {self.tool} {self.code}: {self.message}"
+
+
+class StaticAnalyzer:
+    """Runs local analyzers on the head version of changed files and keeps findings on changed lines only."""
+
+    def __init__(self, blob_store, head_rev: str):
+        self.blob_store = blob_store
+        self.head_rev = head_rev
+
+    def analyze(self, changed_lines: Dict[str, Set[int]]) -> Dict[str, List[StaticFinding]]:
+        """Analyzes files in parallel; `changed_lines` maps each file to its added line numbers."""
+        files = [file for file in changed_lines if StaticAnalyzer.__analyzers_for(file)]
+        if not files:
+            return {}
+
+        # Blobs are read up front: the cat-file process is shared and serialized anyway.
+        sources = {file: self.blob_store.read_text(self.head_rev, file) for file in files}
+        js_modules = {file: self.__is_js_module(file) for file in files}
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = executor.map(lambda file: StaticAnalyzer.__analyze_file(file, sources[file], js_modules[file]), files)
+            findings = {}
+            for file, file_findings in zip(files, results):
+                kept = [finding for finding in file_findings if finding.line in changed_lines[file]]
+                if kept:
+                    findings[file] = kept
+
+        Log.print_green(f"Static analysis: {sum(len(items) for items in findings.values())} finding(s) on changed lines in {len(files)} file(s)")
+        return findings
+
+    @staticmethod
+    def render(file: str, finding: StaticFinding, source_line: str = "") -> str:
+        severity = ":bangbang:Critical" if finding.blocking else ":warning:Warning"
+        issue_type = "Syntax Error" if finding.blocking else f"{finding.tool} {finding.code}"
+        comment = f"**File:** {file}\n\n**[ERROR] - [{severity}] - [{issue_type}] - {finding.message}**\n\n"
+        comment += f"**:point_right:Lines:**\n```\n{finding.line}: {source_line}\n```\n\n"
+        comment += f"_Reported by {finding.tool} (local static analysis)._"
+        return comment
+
+    def __is_js_module(self, file: str) -> bool:
+        """Whether a JavaScript file is an ES module: `.mjs`, or `.js` under a package.json with "type": "module"."""
+        extension = os.path.splitext(file)[1].lower()
+        if extension != ".js":
+            return extension == ".mjs"
+
+        directory = os.path.dirname(file)
+        while True:
+            package_json = self.blob_store.read_text(self.head_rev, f"{directory}/package.json" if directory else "package.json")
+            if package_json is not None:
+                try:
+                    return json.loads(package_json).get("type") == "module"
+                except (ValueError, AttributeError):
+                    return False
+            if not directory:
+                return False
+            directory = os.path.dirname(directory)
+
+    @staticmethod
+    def __analyzers_for(file: str, js_module: bool = False) -> list:
+        extension = os.path.splitext(file)[1].lower()
+        analyzers = []
+        if extension == ".py":
+            if "python" in ENABLED_ANALYZERS:
+                analyzers.append(StaticAnalyzer.__check_python_syntax)
+            if "ruff" in ENABLED_ANALYZERS and shutil.which("ruff"):
+                analyzers.append(StaticAnalyzer.__run_ruff)
+        elif extension in (".js", ".mjs", ".cjs") and "node" in ENABLED_ANALYZERS and shutil.which("node"):
+            analyzers.append(partial(StaticAnalyzer.__run_node_check, js_module=js_module))
+        return analyzers
+
+    @staticmethod
+    def __analyze_file(file: str, source: str, js_module: bool = False) -> List[StaticFinding]:
+        if source is None:
+            return []
+
+        findings = []
+        for analyzer in StaticAnalyzer.__analyzers_for(file, js_module):
+            try:
+                findings.extend(analyzer(file, source))
+            except Exception as e:
+                name = getattr(analyzer, "func", analyzer).__name__
+                Log.print_yellow(f"Static analyzer {name} failed on {file}: {e}")
+
+        # Several tools report the same syntax error; keep the first one per line.
+        syntax_error_lines = set()
+        unique_findings = []
+        for finding in findings:
+            if finding.blocking:
+                if finding.line in syntax_error_lines:
+                    continue
+                syntax_error_lines.add(finding.line)
+            unique_findings.append(finding)
+        return unique_findings
+
+    @staticmethod
+    def __check_python_syntax(file: str, source: str) -> List[StaticFinding]:
+        try:
+            compile(source, file, "exec", dont_inherit=True)
+        except SyntaxError as e:
+            return [StaticFinding(e.lineno or 1, "py_compile", type(e).__name__, e.msg, blocking=True)]
+        return []
+
+    @staticmethod
+    def __run_ruff(file: str, source: str) -> List[StaticFinding]:
+        result = subprocess.run(
+            ["ruff", "check", "--quiet", "--output-format=json", "--stdin-filename", file, "-"],
+            input=source, capture_output=True, text=True, encoding="utf-8", timeout=ANALYZER_TIMEOUT_SECONDS,
+        )
+        if not result.stdout.strip():
+            return []
+
+        findings = []
+        for item in json.loads(result.stdout):
+            code = item.get("code") or "syntax"
+            findings.append(StaticFinding(item["location"]["row"], "ruff", code, item["message"],
+                                          blocking=code == "syntax" or code.startswith("E999")))
+        return findings
+
+    @staticmethod
+    def __run_node_check(file: str, source: str, js_module: bool = False) -> List[StaticFinding]:
+        # The temp file's extension tells node how to parse it: CommonJS allows a top-level `return`,
+        # `with` and legacy octals, which are syntax errors in an ES module.
+        with tempfile.NamedTemporaryFile("w", suffix=".mjs" if js_module else ".cjs", encoding="utf-8", delete=False) as f:
+            f.write(source)
+            temp_path = f.name
+        try:
+            result = subprocess.run(["node", "--check", temp_path], capture_output=True, text=True,
+                                    encoding="utf-8", timeout=ANALYZER_TIMEOUT_SECONDS)
+        finally:
+            os.unlink(temp_path)
+
+        if result.returncode == 0:
+            return []
+
+        lines = result.stderr.splitlines()
+        location = NODE_ERROR_LOCATION_PATTERN.search(lines[0]) if lines else None
+        message = next((line.strip() for line in lines if "Error" in line and not line.strip().startswith("at ")), "Syntax error")
+        message = re.sub(r"^\w*Error:\s*", "", message)
+        return [StaticFinding(int(location.group(1)) if location else 1, "node --check", "SyntaxError", message, blocking=True)]
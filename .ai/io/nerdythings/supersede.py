@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from log import Log
+from repository.repository import RepositoryError
+
+POLL_INTERVAL_SECONDS = float(os.getenv("SUPERSEDE_POLL_INTERVAL", "30"))
+MIN_CHECK_INTERVAL_SECONDS = float(os.getenv("SUPERSEDE_MIN_CHECK_INTERVAL", "5"))
+
+
+class ReviewSuperseded(Exception):
+    pass
+
+
+class SupersedeWatcher:
+    """Detects when the PR head moves past the SHA under review.
+
+    A background thread polls the PR with a conditional (ETag) request and sets `cancel_event`,
+    which in-flight model requests watch; `check()` is called between AI calls.
+    """
+
+    def __init__(self, github, head_sha: str, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.github = github
+        self.head_sha = head_sha
+        self.poll_interval = poll_interval
+        self.cancel_event = threading.Event()
+        self.live_head_sha = head_sha
+        self.__stop_event = threading.Event()
+        self.__lock = threading.Lock()
+        self.__last_poll = 0.0
+        self.__thread = None
+
+    @property
+    def superseded(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def start(self):
+        if not self.head_sha:
+            return
+        self.__thread = threading.Thread(target=self.__poll_loop, name="supersede-watcher", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+
+    def check(self):
+        """Raises ReviewSuperseded if the PR head changed; polls GitHub at most every few seconds."""
+        if not self.superseded and time.monotonic() - self.__last_poll >= MIN_CHECK_INTERVAL_SECONDS:
+            self.__poll()
+        if self.superseded:
+            raise ReviewSuperseded(f"Head moved from {self.head_sha} to {self.live_head_sha}")
+
+    def __poll_loop(self):
+        while not self.__stop_event.wait(self.poll_interval):
+            self.__poll()
+            if self.superseded:
+                return
+
+    def __poll(self):
+        if not self.head_sha:
+            return
+        with self.__lock:
+            self.__last_poll = time.monotonic()
+            try:
+                live_head_sha = self.github.get_live_head_sha()
+            except RepositoryError as e:
+                Log.print_yellow(f"Could not check the PR head: {e}")
+                return
+
+            if live_head_sha and live_head_sha != self.head_sha:
+                self.live_head_sha = live_head_sha
+                if not self.cancel_event.is_set():
+                    Log.print_yellow(f"PR head moved to {live_head_sha}; this run for {self.head_sha} is superseded.")
+                self.cancel_event.set()
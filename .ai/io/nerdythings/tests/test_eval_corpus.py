@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diff_chunker import DiffChunk, DiffChunker
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eval", "corpus")
+
+
+def load_cases():
+    cases = []
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        with open(os.path.join(CORPUS_DIR, name), "r", encoding="utf-8") as f:
+            cases.append(json.load(f))
+    return cases
+
+
+def test_added_lines_match_the_head_file():
+    for case in load_cases():
+        header, hunks = DiffChunker.parse_hunks(case["diff"])
+        code_lines = case["code"].splitlines()
+        added = [line[1:] for hunk in hunks for line in hunk.lines if line.startswith("+")]
+        numbers = DiffChunk(header, hunks).added_line_numbers
+        assert added, case["id"]
+        assert [code_lines[number - 1] for number in numbers] == added, case["id"]
+
+
+def test_expected_ranges_cover_added_lines():
+    for case in load_cases():
+        header, hunks = DiffChunker.parse_hunks(case["diff"])
+        numbers = set(DiffChunk(header, hunks).added_line_numbers)
+        if case["label"] == "clean":
+            assert case["expected"] == [], case["id"]
+        for issue in case["expected"]:
+            assert set(range(issue["start_line"], issue["end_line"] + 1)) <= numbers, case["id"]
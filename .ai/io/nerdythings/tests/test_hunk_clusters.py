@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hunk_clusters import HunkClusterIndex
+
+
+def one_line_hunk(file, old, new):
+    return f"diff --git a/{file} b/{file}\n--- a/{file}\n+++ b/{file}\n@@ -10,1 +10,1 @@\n-{old}\n+{new}"
+
+
+def test_identical_one_line_fixes_share_one_cluster():
+    hunks = [one_line_hunk(f"src/module_{i}.py", "    logger.warn(msg)", "    logger.warning(msg)") for i in range(300)]
+    clusters = HunkClusterIndex().cluster(hunks)
+    assert len(clusters) == 1
+    assert len(clusters[0].members) == 300
+
+
+def test_identical_dependency_renames_share_one_cluster():
+    hunks = [one_line_hunk(f"web/page_{i}.js", "import lodash from 'lodash'", "import lodash from 'lodash-es'") for i in range(300)]
+    assert len(HunkClusterIndex().cluster(hunks)) == 1
+
+
+def test_short_hunks_that_differ_stay_apart():
+    pairs = [
+        ('const secret = "abc123"', 'const port = "8080"'),
+        ("if (validPassword) {", "if (isAdmin) {"),
+        ("res.status(200).json(user)", "res.status(500).json(err)"),
+    ]
+    for left, right in pairs:
+        hunks = [one_line_hunk("a.js", "x", left), one_line_hunk("b.js", "x", right)]
+        assert len(HunkClusterIndex().cluster(hunks)) == 2